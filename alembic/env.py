@@ -66,6 +66,9 @@ def run_migrations_offline() -> None:
 
 
 def include_object(obj, name, type_, reflected, compare_to) -> bool:
+    # full-text indexes are created by ddl events (see api.models.jobs.FULLTEXT_DDL)
+    if name == "ix_jobs_jobs_fulltext" or name.startswith("jobs_jobs_fts"):
+        return False
     return not NAME or type_ != "table" or name.startswith(NAME + "_")
 
 
@@ -0,0 +1,22 @@
+"""Add last_update index to jobs table
+
+Revision ID: 4d5b002950a7
+Create Date: 2026-10-17 09:12:31.482913
+"""
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "4d5b002950a7"
+down_revision = "b74604db38b3"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_jobs_jobs_last_update_id", "jobs_jobs", ["last_update", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_jobs_jobs_last_update_id", table_name="jobs_jobs")
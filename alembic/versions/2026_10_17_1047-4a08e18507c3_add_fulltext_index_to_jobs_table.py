@@ -0,0 +1,63 @@
+"""Add fulltext index to jobs table
+
+Revision ID: 4a08e18507c3
+Create Date: 2026-10-17 10:47:05.219384
+"""
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "4a08e18507c3"
+down_revision = "4d5b002950a7"
+branch_labels = None
+depends_on = None
+
+
+POSTGRES_DOCUMENT = (
+    "to_tsvector('simple', coalesce(title, '') || ' ' || coalesce(description, '') || ' ' "
+    "|| coalesce(_responsibilities, ''))"
+)
+
+SQLITE_FTS_COLUMNS = "title, description, _responsibilities"
+SQLITE_FTS_NEW = "new.rowid, new.title, new.description, new._responsibilities"
+SQLITE_FTS_OLD = "'delete', old.rowid, old.title, old.description, old._responsibilities"
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == "mysql":
+        op.create_index(
+            "ix_jobs_jobs_fulltext", "jobs_jobs", ["title", "description", "_responsibilities"], mysql_prefix="FULLTEXT"
+        )
+    elif dialect == "postgresql":
+        op.execute(f"CREATE INDEX ix_jobs_jobs_fulltext ON jobs_jobs USING gin ({POSTGRES_DOCUMENT})")
+    elif dialect == "sqlite":
+        op.execute(
+            f"CREATE VIRTUAL TABLE jobs_jobs_fts USING fts5({SQLITE_FTS_COLUMNS}, content='jobs_jobs', "
+            "content_rowid='rowid')"
+        )
+        op.execute(
+            "CREATE TRIGGER jobs_jobs_fts_insert AFTER INSERT ON jobs_jobs BEGIN "
+            f"INSERT INTO jobs_jobs_fts(rowid, {SQLITE_FTS_COLUMNS}) VALUES ({SQLITE_FTS_NEW}); END"
+        )
+        op.execute(
+            "CREATE TRIGGER jobs_jobs_fts_delete AFTER DELETE ON jobs_jobs BEGIN "
+            f"INSERT INTO jobs_jobs_fts(jobs_jobs_fts, rowid, {SQLITE_FTS_COLUMNS}) VALUES ({SQLITE_FTS_OLD}); END"
+        )
+        op.execute(
+            "CREATE TRIGGER jobs_jobs_fts_update AFTER UPDATE ON jobs_jobs BEGIN "
+            f"INSERT INTO jobs_jobs_fts(jobs_jobs_fts, rowid, {SQLITE_FTS_COLUMNS}) VALUES ({SQLITE_FTS_OLD}); "
+            f"INSERT INTO jobs_jobs_fts(rowid, {SQLITE_FTS_COLUMNS}) VALUES ({SQLITE_FTS_NEW}); END"
+        )
+        op.execute("INSERT INTO jobs_jobs_fts(jobs_jobs_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect in ("mysql", "postgresql"):
+        op.drop_index("ix_jobs_jobs_fulltext", table_name="jobs_jobs")
+    elif dialect == "sqlite":
+        for trigger in ["insert", "delete", "update"]:
+            op.execute(f"DROP TRIGGER jobs_jobs_fts_{trigger}")
+        op.execute("DROP TABLE jobs_jobs_fts")
@@ -0,0 +1,40 @@
+"""Add filter indexes to jobs tables
+
+Revision ID: 9c3e51f7a2d8
+Create Date: 2026-10-17 15:32:08.215634
+"""
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "9c3e51f7a2d8"
+down_revision = "4a08e18507c3"
+branch_labels = None
+depends_on = None
+
+
+INDEXES = {
+    "ix_jobs_jobs_company_id": ("jobs_jobs", ["company_id"]),
+    "ix_jobs_jobs_remote_last_update_id": ("jobs_jobs", ["remote", "last_update", "id"]),
+    "ix_jobs_jobs_type_last_update_id": ("jobs_jobs", ["type", "last_update", "id"]),
+    "ix_jobs_jobs_professional_level_last_update_id": ("jobs_jobs", ["professional_level", "last_update", "id"]),
+    "ix_jobs_jobs_salary_per_last_update_id": ("jobs_jobs", ["salary_per", "last_update", "id"]),
+    "ix_jobs_jobs_salary_min": ("jobs_jobs", ["salary_min"]),
+    "ix_jobs_jobs_salary_max": ("jobs_jobs", ["salary_max"]),
+    "ix_jobs_skill_requirements_skill_id": ("jobs_skill_requirements", ["skill_id"]),
+}
+
+
+def upgrade() -> None:
+    # on mysql, this also replaces the index which was created implicitly for the foreign key on company_id
+    for name, (table, columns) in INDEXES.items():
+        op.create_index(name, table, columns)
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "mysql":
+        # the foreign key on company_id needs an index, so restore the implicit one before dropping ours
+        op.create_index("company_id", "jobs_jobs", ["company_id"])
+    for name, (table, _) in reversed(INDEXES.items()):
+        op.drop_index(name, table_name=table)
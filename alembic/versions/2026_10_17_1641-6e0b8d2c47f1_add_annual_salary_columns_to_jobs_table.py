@@ -0,0 +1,63 @@
+"""Add annual salary columns to jobs table
+
+Revision ID: 6e0b8d2c47f1
+Create Date: 2026-10-17 16:41:27.903175
+"""
+
+from typing import Any
+
+from alembic import op
+
+import sqlalchemy as sa
+from sqlalchemy.sql import ColumnElement
+
+from api.settings import settings
+
+
+# revision identifiers, used by Alembic.
+revision = "6e0b8d2c47f1"
+down_revision = "9c3e51f7a2d8"
+branch_labels = None
+depends_on = None
+
+
+# number of salary periods per year by the stored value of jobs_jobs.salary_per (frozen copy of the defaults of
+# settings.salary_periods_per_year), salaries paid once or per task cannot be annualized
+PERIODS_PER_YEAR = {"HOUR": 2080, "DAY": 260, "MONTH": 12, "YEAR": 1}
+
+
+def upgrade() -> None:
+    op.add_column("jobs_jobs", sa.Column("annual_salary_min", sa.BigInteger(), nullable=True))
+    op.add_column("jobs_jobs", sa.Column("annual_salary_max", sa.BigInteger(), nullable=True))
+    op.create_index("ix_jobs_jobs_annual_salary_min", "jobs_jobs", ["annual_salary_min"])
+    op.create_index("ix_jobs_jobs_annual_salary_max", "jobs_jobs", ["annual_salary_max"])
+
+    # the exchange rates are deployment configuration rather than code, so the configured ones are used
+    rates = {currency.strip().upper(): rate for currency, rate in settings.salary_exchange_rates.items()}
+    rates.setdefault(settings.salary_base_currency.strip().upper(), 1)
+
+    jobs = sa.table(
+        "jobs_jobs",
+        sa.column("salary_min", sa.Integer),
+        sa.column("salary_max", sa.Integer),
+        sa.column("salary_unit", sa.Text),
+        sa.column("salary_per", sa.String),
+        sa.column("annual_salary_min", sa.BigInteger),
+        sa.column("annual_salary_max", sa.BigInteger),
+    )
+    # unknown currencies and periods result in NULL
+    rate: ColumnElement[Any] = sa.case(rates, value=sa.func.upper(sa.func.trim(jobs.c.salary_unit)))
+    periods: ColumnElement[Any] = sa.case(PERIODS_PER_YEAR, value=jobs.c.salary_per)
+    op.execute(
+        sa.update(jobs).values(
+            annual_salary_min=sa.func.round(jobs.c.salary_min * rate * periods),
+            annual_salary_max=sa.func.round(jobs.c.salary_max * rate * periods),
+        )
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_jobs_jobs_annual_salary_max", table_name="jobs_jobs")
+    op.drop_index("ix_jobs_jobs_annual_salary_min", table_name="jobs_jobs")
+    op.drop_column("jobs_jobs", "annual_salary_max")
+    op.drop_column("jobs_jobs", "annual_salary_min")
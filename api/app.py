@@ -3,25 +3,28 @@
 See [Auth Microservice](/auth/docs).
 """
 
-from typing import Awaitable, Callable, TypeVar
+from time import perf_counter
 
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.exception_handlers import http_exception_handler
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import Response
+from starlette.datastructures import MutableHeaders
 from starlette.exceptions import HTTPException as StarletteHTTPException
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from . import __version__
 from .database import db, db_context
+from .database.database import QueryStats
 from .endpoints import ROUTER, TAGS
 from .logger import get_logger, setup_sentry
+from .revocations import revoked_sessions
+from .services.internal import InternalService
 from .settings import settings
-from .utils.debug import check_responses
+from .utils.debug import CheckResponsesMiddleware
 from .utils.docs import add_endpoint_links_to_openapi_docs
 
 
-T = TypeVar("T")
-
 logger = get_logger(__name__)
 
 app = FastAPI(
@@ -36,7 +39,7 @@ app = FastAPI(
 app.include_router(ROUTER)
 
 if settings.debug:
-    app.middleware("http")(check_responses)
+    app.add_middleware(CheckResponsesMiddleware)
 
 
 add_endpoint_links_to_openapi_docs(app.openapi())
@@ -47,30 +50,93 @@ if settings.sentry_dsn:
 
 if settings.debug:
     app.add_middleware(
-        CORSMiddleware, allow_origins=["*"], allow_credentials=True, allow_methods=["*"], allow_headers=["*"]
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=["X-Next-Cursor", "Server-Timing"],
     )
 
 
-@app.middleware("http")
-async def db_session(request: Request, call_next: Callable[..., Awaitable[T]]) -> T:
-    async with db_context():
-        return await call_next(request)
+class DBSessionMiddleware:
+    """
+    Open a database context for each http request.
+
+    The session is committed before the response is started and closed after the response body has been sent, so
+    streaming responses can still use it. Sessions of GET and HEAD requests are read-only and may use a read replica.
+
+    The number and execution time of the sql statements are sent in the `Server-Timing` header, and requests which
+    take longer than `slow_request_threshold` seconds are logged. The header is sent when the response starts, so for
+    streaming responses it only covers the statements executed before the body, while the log covers all of them.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = perf_counter()
+        status: int | None = None
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+
+            if message["type"] == "http.response.start":
+                await db.commit()
+                status = message["status"]
+                if stats := db.stats:
+                    MutableHeaders(scope=message).append("Server-Timing", _server_timing(stats, perf_counter() - start))
+            await send(message)
+
+        async with db_context(read_only=scope["method"] in ("GET", "HEAD")):
+            stats = db.stats
+            await self.app(scope, receive, send_wrapper)
+
+        if (duration := perf_counter() - start) >= settings.slow_request_threshold:
+            logger.warning(
+                f"Slow request: {scope['method']} {scope['path']} ({status}) took {duration * 1000:.1f} ms"
+                + (_slow_request_details(stats) if stats else "")
+            )
+
+
+def _server_timing(stats: QueryStats, duration: float) -> str:
+    out = f'db;desc="{stats.count} statements";dur={stats.duration * 1000:.1f}'
+    if stats.count:
+        out += f", db-slowest;dur={stats.slowest_duration * 1000:.1f}"
+    return out + f", total;dur={duration * 1000:.1f}"
+
+
+def _slow_request_details(stats: QueryStats) -> str:
+    out = f", {stats.count} sql statements took {stats.duration * 1000:.1f} ms"
+    if stats.count:
+        out += f", slowest ({stats.slowest_duration * 1000:.1f} ms): {stats.slowest_statement}"
+    return out
+
+
+app.add_middleware(DBSessionMiddleware)
 
 
 @app.exception_handler(StarletteHTTPException)
 async def rollback_on_exception(request: Request, exc: HTTPException) -> Response:
-    await db.session.rollback()
+    await db.rollback()
     return await http_exception_handler(request, exc)
 
 
 @app.on_event("startup")
 async def on_startup() -> None:
-    pass
+    InternalService.open_clients()
+    if settings.revoked_sessions_listener:
+        revoked_sessions.start()
 
 
 @app.on_event("shutdown")
 async def on_shutdown() -> None:
-    pass
+    await InternalService.close_clients()
+    await revoked_sessions.stop()
 
 
 @app.head("/status", include_in_schema=False)
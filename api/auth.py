@@ -1,3 +1,4 @@
+import time
 from typing import Any, Awaitable, Callable
 
 from fastapi import Depends, Request
@@ -8,6 +9,8 @@ from pydantic import ValidationError
 from .exceptions.auth import EmailNotVerifiedError, InvalidTokenError, PermissionDeniedError, UserNotFoundError
 from .schemas.user import User, UserAccessToken
 from .services.auth import exists_user
+from .settings import settings
+from .utils.cache import LocalCache
 from .utils.jwt import decode_jwt
 
 
@@ -42,18 +45,37 @@ class InternalAuth(JWTAuth):
         super().__init__(audience=audience, force_valid=True)
 
 
+class UserTokenAuth(HTTPAuth):
+    """Parse user access tokens. Valid tokens are cached until they expire, so each token is only decoded once."""
+
+    def __init__(self, cache_size: int):
+        super().__init__()
+        self._cache: LocalCache[UserAccessToken] = LocalCache(cache_size)
+
+    async def __call__(self, request: Request) -> UserAccessToken | None:
+        token = get_token(request)
+        if (access_token := self._cache.get(token)) is not None:
+            return access_token
+
+        if (data := decode_jwt(token)) is None:
+            return None
+        try:
+            access_token = UserAccessToken.parse_obj(data)
+        except ValidationError:
+            return None
+
+        self._cache.set(token, access_token, data["exp"] - time.time())
+        return access_token
+
+
 jwt_auth = Depends(JWTAuth(force_valid=False))
 internal_auth = Depends(InternalAuth(audience=["jobs"]))
+user_token_auth = Depends(UserTokenAuth(settings.token_cache_size))
 
 
 @Depends
-async def public_auth(data: dict[Any, Any] = jwt_auth) -> User | None:
-    try:
-        token: UserAccessToken = UserAccessToken.parse_obj(data)
-    except (InvalidTokenError, ValidationError):
-        return None
-
-    if await token.is_revoked():
+async def public_auth(token: UserAccessToken | None = user_token_auth) -> User | None:
+    if token is None or await token.is_revoked():
         return None
 
     return token.to_user()
@@ -9,15 +9,22 @@ T = TypeVar("T")
 
 
 @asynccontextmanager
-async def db_context() -> AsyncIterator[None]:
-    """Async context manager for database sessions."""
+async def db_context(read_only: bool = False) -> AsyncIterator[None]:
+    """
+    Async context manager for database sessions. The session is only opened if it is actually used.
 
-    db.create_session()
+    If `read_only` is set, the session is bound to a read replica (if configured), so it must not be used for writes.
+    """
+
+    token = db.open_scope(read_only)
     try:
         yield
     finally:
-        await db.commit()
-        await db.close()
+        try:
+            await db.commit()
+            await db.close()
+        finally:
+            db.reset_scope(token)
 
 
 def db_wrapper(f: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
@@ -1,10 +1,13 @@
 from asyncio import Event
-from contextvars import ContextVar
+from contextvars import ContextVar, Token
 from datetime import datetime, timezone
+from itertools import count as counter
+from time import perf_counter
 from typing import Any, AsyncIterator, Type, TypeVar, cast
 
-from sqlalchemy import Column, DateTime, TypeDecorator
-from sqlalchemy.engine import Result
+from sqlalchemy import Column, DateTime, TypeDecorator, event
+from sqlalchemy.engine import CursorResult, Result
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
 from sqlalchemy.future import select as sa_select
 from sqlalchemy.orm import DeclarativeMeta, registry, selectinload
@@ -91,11 +94,70 @@ class Base(metaclass=DeclarativeMeta):
         self.registry.constructor(self, **kwargs)
 
 
+class QueryStats:
+    """Number and execution time of the sql statements which have been executed in a database context."""
+
+    def __init__(self) -> None:
+        self.count: int = 0
+        self.duration: float = 0
+        self.slowest_duration: float = 0
+        self.slowest_statement: str | None = None
+
+    def record(self, statement: str, duration: float) -> None:
+        """Add a statement and its execution time (in seconds) to the statistics."""
+
+        self.count += 1
+        self.duration += duration
+        if self.slowest_statement is None or duration > self.slowest_duration:
+            self.slowest_duration = duration
+            self.slowest_statement = statement
+
+
+class SessionScope:
+    """
+    State of a database context. The session is only created when it is accessed for the first time.
+
+    This object is shared (not copied) with tasks started inside the context, so sessions created there are still
+    committed and closed at the end of the context.
+    """
+
+    def __init__(self, read_only: bool = False) -> None:
+        self.read_only: bool = read_only
+        self.session: AsyncSession | None = None
+        # engines to try next if the session cannot connect to its engine (only used for read-only sessions)
+        self.fallback_engines: list[AsyncEngine] = []
+        self.close_event: Event = Event()
+        self.stats: QueryStats = QueryStats()
+
+
 class DB:
-    def __init__(self, url: str, **kwargs: Any):
+    def __init__(self, url: str, replica_urls: list[str] | None = None, **kwargs: Any):
         self.engine: AsyncEngine = create_async_engine(url, **kwargs)
-        self._session: ContextVar[AsyncSession | None] = ContextVar("session", default=None)
-        self._close_event: ContextVar[Event | None] = ContextVar("close_event", default=None)
+        self.replica_engines: list[AsyncEngine] = [
+            create_async_engine(replica_url, **kwargs) for replica_url in replica_urls or []
+        ]
+        self._replica_counter = counter()
+        self._scope: ContextVar[SessionScope | None] = ContextVar("session_scope", default=None)
+
+        for engine in [self.engine, *self.replica_engines]:
+            self.instrument(engine)
+
+    def instrument(self, engine: AsyncEngine) -> None:
+        """Register the event hooks which record the statements executed on an engine in the query statistics."""
+
+        event.listen(engine.sync_engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine.sync_engine, "after_cursor_execute", self._after_cursor_execute)
+
+    def _before_cursor_execute(
+        self, _conn: Any, _cursor: Any, _statement: str, _params: Any, context: Any, *_: Any
+    ) -> None:
+        context.query_start_time = perf_counter()
+
+    def _after_cursor_execute(
+        self, _conn: Any, _cursor: Any, statement: str, _params: Any, context: Any, *_: Any
+    ) -> None:
+        if scope := self._scope.get():
+            scope.stats.record(statement, perf_counter() - context.query_start_time)
 
     async def create_tables(self) -> None:
         """Create all tables defined in enabled cog packages."""
@@ -129,11 +191,13 @@ class DB:
     async def exec(self, statement: Executable | str) -> Result:
         """Execute an sql statement and return the result."""
 
+        await self._connect()
         return await self.session.execute(cast(Executable, statement))
 
     async def stream(self, statement: Executable | str) -> AsyncIterator[Any]:
         """Execute an sql statement and stream the result."""
 
+        await self._connect()
         return cast(AsyncIterator[Any], (await self.session.stream(statement)).scalars())
 
     async def all(self, statement: Executable | str) -> list[Any]:
@@ -161,36 +225,108 @@ class DB:
 
         return await self.first(filter_by(cls, *args, **kwargs))
 
+    async def bulk_delete(self, statement: Delete) -> int:
+        """Execute a bulk delete statement (without loading or synchronizing any objects) and return the row count."""
+
+        result = await self.exec(statement.execution_options(synchronize_session=False))
+        return cast(CursorResult, result).rowcount
+
     async def commit(self) -> None:
-        """Shortcut for :meth:`sqlalchemy.ext.asyncio.AsyncSession.commit`"""
+        """Shortcut for :meth:`sqlalchemy.ext.asyncio.AsyncSession.commit` (if a session has been opened)"""
+
+        if (scope := self._scope.get()) and scope.session:
+            await scope.session.commit()
 
-        if self._session.get():
-            await self.session.commit()
+    async def rollback(self) -> None:
+        """Shortcut for :meth:`sqlalchemy.ext.asyncio.AsyncSession.rollback` (if a session has been opened)"""
+
+        if (scope := self._scope.get()) and scope.session:
+            await scope.session.rollback()
 
     async def close(self) -> None:
-        """Close the current session"""
+        """Close the current session (if it has been opened)"""
 
-        if self._session.get():
-            await self.session.close()
-            if close_event := self._close_event.get():
-                close_event.set()
+        if not (scope := self._scope.get()):
+            return
 
-    def create_session(self) -> AsyncSession:
-        """Create a new async session and store it in the context variable."""
+        if scope.session:
+            await scope.session.close()
+            scope.session = None
+        scope.close_event.set()
 
-        self._session.set(session := AsyncSession(self.engine))
-        self._close_event.set(Event())
-        return session
+    def open_scope(self, read_only: bool = False) -> Token[SessionScope | None]:
+        """
+        Start a new database context in which a session is created on demand.
+
+        :param read_only: whether the session may be bound to a read replica
+        :return: a token for :meth:`reset_scope`
+        """
+
+        return self._scope.set(SessionScope(read_only))
+
+    def reset_scope(self, token: Token[SessionScope | None]) -> None:
+        """Restore the database context which was active before :meth:`open_scope` was called."""
+
+        self._scope.reset(token)
 
     @property
     def session(self) -> AsyncSession:
-        """Get the session object for the current task"""
+        """Get the session object for the current database context and create it if necessary"""
+
+        if not (scope := self._scope.get()):
+            raise RuntimeError("no database context")
+
+        if scope.session is None:
+            engine, *scope.fallback_engines = self.get_engines(scope.read_only)
+            scope.session = AsyncSession(engine)
+        return scope.session
+
+    @property
+    def stats(self) -> QueryStats | None:
+        """Get the query statistics of the current database context"""
+
+        return scope.stats if (scope := self._scope.get()) else None
+
+    def get_engines(self, read_only: bool) -> list[AsyncEngine]:
+        """
+        Return the engines a session may be bound to, in the order in which they should be tried.
+
+        Read-only sessions prefer the next read replica (round-robin) and fall back to the other replicas and finally to
+        the primary. All other sessions always use the primary.
+        """
+
+        if not read_only or not self.replica_engines:
+            return [self.engine]
+        i = next(self._replica_counter) % len(self.replica_engines)
+        return [*self.replica_engines[i:], *self.replica_engines[:i], self.engine]
+
+    def use_primary(self) -> None:
+        """
+        Bind the session of the current read-only context to the primary, e.g. because the replicas may not have
+        applied a recent write yet. This has no effect if the session has already been created.
+        """
+
+        if (scope := self._scope.get()) and scope.session is None:
+            scope.read_only = False
+
+    async def _connect(self) -> None:
+        """Make sure the session of the current context is connected, skipping engines which are unreachable."""
 
-        return cast(AsyncSession, self._session.get())
+        session = self.session
+        scope = cast(SessionScope, self._scope.get())
+        while scope.fallback_engines:
+            try:
+                await session.connection()
+                break
+            except (DBAPIError, OSError) as e:
+                logger.warning(f"Could not connect to database {session.bind.url!r}, trying the next one: {e}")
+                await session.close()
+                session = scope.session = AsyncSession(scope.fallback_engines.pop(0))
+        scope.fallback_engines.clear()
 
     async def wait_for_close_event(self) -> None:
-        if close_event := self._close_event.get():
-            await close_event.wait()
+        if scope := self._scope.get():
+            await scope.close_event.wait()
 
 
 def get_database() -> DB:
@@ -202,6 +338,7 @@ def get_database() -> DB:
 
     return DB(
         url=settings.database_url,
+        replica_urls=settings.database_replica_urls,
         pool_pre_ping=True,
         pool_recycle=settings.pool_recycle,
         pool_size=settings.pool_size,
@@ -2,30 +2,42 @@
 
 from typing import Any
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Request
 
 from api import models
 from api.auth import admin_auth
-from api.database import db, filter_by, select
+from api.database import db, delete, filter_by, select
 from api.exceptions.auth import admin_responses
 from api.exceptions.companies import CompanyAlreadyExistsError, CompanyNotFoundError
 from api.schemas.companies import Company, CreateCompany, UpdateCompany
-from api.utils.cache import clear_cache, redis_cached
+from api.utils.cache import clear_cache, read_generation, redis_cached
+from api.utils.etag import NOT_MODIFIED, etag_headers, etag_matches, make_etag, not_modified
+from api.utils.fast_json import FastJSONResponse
 
 
 router = APIRouter()
 
 
-@router.get("/companies", dependencies=[admin_auth], responses=admin_responses(list[Company]))
 @redis_cached("companies")
-async def list_all_companies() -> Any:
+async def _list_companies() -> list[dict[str, Any]]:
+    return [company.serialize async for company in await db.stream(select(models.Company))]
+
+
+@router.get("/companies", dependencies=[admin_auth], responses=admin_responses(list[Company]) | NOT_MODIFIED)
+async def list_all_companies(request: Request) -> Any:
     """
     List all companies.
 
+    Responses carry an `ETag` header. If it matches the `If-None-Match` request header, `304 Not Modified` is returned.
+
     *Requirements:* **ADMIN**
     """
 
-    return [company.serialize async for company in await db.stream(select(models.Company))]
+    etag = make_etag(await read_generation("companies"))
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    return FastJSONResponse(await _list_companies(), headers=etag_headers(etag))
 
 
 @router.post("/companies", dependencies=[admin_auth], responses=admin_responses(Company, CompanyAlreadyExistsError))
@@ -48,10 +60,12 @@ async def create_company(data: CreateCompany) -> Any:
         data.instagram_handle,
         data.logo_url,
     )
+    out = company.serialize
 
+    await db.commit()
     await clear_cache("companies")
 
-    return company.serialize
+    return FastJSONResponse(out)
 
 
 @router.patch(
@@ -92,10 +106,13 @@ async def update_company(company_id: str, data: UpdateCompany) -> Any:
 
     if data.logo_url is not None and data.logo_url != company.logo_url:
         company.logo_url = data.logo_url
+    out = company.serialize
 
+    await db.commit()
     await clear_cache("companies")
+    await clear_cache("jobs")
 
-    return company.serialize
+    return FastJSONResponse(out)
 
 
 @router.delete(
@@ -108,12 +125,14 @@ async def delete_company(company_id: str) -> Any:
     *Requirements:* **ADMIN**
     """
 
-    company = await db.get(models.Company, id=company_id)
-    if not company:
+    jobs = select(models.Job.id).where(models.Job.company_id == company_id)
+    await db.bulk_delete(delete(models.SkillRequirement).where(models.SkillRequirement.job_id.in_(jobs)))
+    await db.bulk_delete(delete(models.Job).where(models.Job.company_id == company_id))
+    if not await db.bulk_delete(delete(models.Company).where(models.Company.id == company_id)):
         raise CompanyNotFoundError
 
-    await db.delete(company)
-
+    await db.commit()
     await clear_cache("companies")
+    await clear_cache("jobs")
 
     return True
@@ -1,29 +1,179 @@
 """Endpoints related to jobs."""
 
-from typing import Any
-
-from fastapi import APIRouter, Query
-from sqlalchemy import func, or_
+import base64
+import binascii
+import hashlib
+import json
+from datetime import datetime
+from enum import Enum
+from typing import Any, AsyncIterator, cast
+
+from fastapi import APIRouter, Query, Request
+from fastapi.responses import Response, StreamingResponse
+from sqlalchemy import and_, case, func, literal, not_, or_
+from sqlalchemy.orm import joinedload, selectinload, with_expression
+from sqlalchemy.sql import ColumnElement, Select
 
 from api import models
 from api.auth import admin_auth, public_auth
-from api.database import db, select
+from api.database import db, delete, exists, filter_by, select
 from api.exceptions.auth import admin_responses
 from api.exceptions.companies import CompanyNotFoundError
-from api.exceptions.jobs import JobNotFoundError, SkillNotFoundError
+from api.exceptions.jobs import InvalidCursorError, JobNotFoundError, SkillNotFoundError
 from api.models.jobs import JobType, ProfessionalLevel, SalaryPer
 from api.schemas.jobs import CreateJob, Job, UpdateJob
 from api.schemas.user import User
 from api.services.skills import get_skill_levels, get_skills
+from api.settings import settings
+from api.utils.cache import clear_cache, read_generation, redis_cached
 from api.utils.docs import responses
+from api.utils.etag import NOT_MODIFIED, etag_headers, etag_matches, make_etag, not_modified
+from api.utils.fast_json import FastJSONResponse, dumps
 from api.utils.utc import utcnow
 
 
 router = APIRouter()
 
 
-@router.get("/jobs", responses=responses(list[Job]))
+def _encode_cursor(job: models.Job, ranked: bool) -> str:
+    position: list[Any] = [job.search_rank] if ranked else []
+    position += [job.last_update.isoformat(), job.id]
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str, ranked: bool) -> list[Any] | None:
+    try:
+        *rank, last_update, job_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if len(rank) != ranked:
+            return None
+        return [*map(float, rank), datetime.fromisoformat(last_update), str(job_id)]
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError):
+        return None
+
+
+def _after(order: list[ColumnElement[Any]], position: list[Any]) -> ColumnElement[Any]:
+    """SQL expression which selects all rows after the given position in a descending keyset order."""
+
+    (expr, value), *rest = zip(order, position)
+    if not rest:
+        return cast(ColumnElement[Any], expr < value)
+    return or_(expr < value, and_(expr == value, _after(order[1:], position[1:])))
+
+
+def _with_relationships(query: Select) -> Select:
+    """Load everything that is needed to serialize the jobs of a query (relationships are never loaded lazily)."""
+
+    return query.options(joinedload(models.Job.company), selectinload(models.Job.skill_requirements))
+
+
+def _requirements_met(levels: dict[str, int]) -> ColumnElement[Any]:
+    """SQL expression which is true iff all skill requirements of a job are satisfied by the given skill levels."""
+
+    level = case(levels, value=models.SkillRequirement.skill_id, else_=0) if levels else literal(0)
+    return not_(
+        exists(
+            select(models.SkillRequirement).where(
+                models.SkillRequirement.job_id == models.Job.id, models.SkillRequirement.level > level
+            )
+        )
+    )
+
+
+def _fulltext_search(term: str) -> tuple[ColumnElement[Any], ColumnElement[Any]] | None:
+    # very short terms are usually below the minimum token length of full-text indexes, so use LIKE for them instead
+    if not settings.fulltext_search or len(term.strip()) < 3:
+        return None
+    return models.Job.fulltext_search(db.engine.dialect.name, term)
+
+
+def _normalize_params(**params: Any) -> tuple[tuple[str, Any], ...]:
+    """Return the parsed query parameters in a canonical form, so equivalent requests share cache entries and tags."""
+
+    out = []
+    for name, value in sorted(params.items()):
+        if isinstance(value, list):
+            value = sorted({item.value if isinstance(item, Enum) else item for item in value})
+        elif isinstance(value, Enum):
+            value = value.value
+        if value not in (None, "", []):
+            out.append((name, value))
+    return tuple(out)
+
+
+def _fingerprint(levels: dict[str, int], admin: bool) -> str:
+    """Hash of everything about a user that affects the job list."""
+
+    return hashlib.sha256(json.dumps([admin, sorted(levels.items())]).encode()).hexdigest()
+
+
+def _meets_requirements(job: models.Job, levels: dict[str, int]) -> bool:
+    return all(levels.get(requirement.skill_id, 0) >= requirement.level for requirement in job.skill_requirements)
+
+
+def _serialize(
+    job: models.Job, skills: dict[str, Any], levels: dict[str, int], requirements_met: bool | None, admin: bool
+) -> dict[str, Any]:
+    ok = _meets_requirements(job, levels) if requirements_met is None else requirements_met
+    return job.serialize_with_skills(skills, include_contact=admin or ok)
+
+
+async def _render_jobs(
+    query: Select,
+    *,
+    ranked: bool,
+    limit: int | None,
+    levels: dict[str, int],
+    requirements_met: bool | None,
+    admin: bool,
+) -> tuple[bytes, str | None]:
+    """Execute a job list query and return the encoded response body and the next cursor (if any)."""
+
+    skills = await get_skills()
+    out: list[dict[str, Any]] = []
+    last: Any = None
+    next_cursor = None
+    async for job in await db.stream(query):
+        if len(out) == limit:
+            next_cursor = _encode_cursor(last, ranked)
+            break
+        last = job
+        out.append(_serialize(job, skills, levels, requirements_met, admin))
+
+    return dumps(out), next_cursor
+
+
+@redis_cached("jobs", "params", "fingerprint")
+async def _render_jobs_cached(
+    params: tuple[tuple[str, Any], ...],
+    fingerprint: str,
+    query: Select,
+    *,
+    ranked: bool,
+    limit: int | None,
+    levels: dict[str, int],
+    requirements_met: bool | None,
+    admin: bool,
+) -> tuple[bytes, str | None]:
+    """Cached version of `_render_jobs`, keyed by the normalized query parameters and the user's fingerprint."""
+
+    return await _render_jobs(
+        query, ranked=ranked, limit=limit, levels=levels, requirements_met=requirements_met, admin=admin
+    )
+
+
+async def _stream_jobs(
+    query: Select, *, levels: dict[str, int], requirements_met: bool | None, admin: bool
+) -> AsyncIterator[bytes]:
+    """Execute a job list query and yield one encoded job per line while the rows arrive from the database."""
+
+    skills = await get_skills()
+    async for job in await db.stream(query.execution_options(yield_per=settings.stream_batch_size)):
+        yield dumps(_serialize(job, skills, levels, requirements_met, admin)) + b"\n"
+
+
+@router.get("/jobs", responses=responses(list[Job], InvalidCursorError) | NOT_MODIFIED)
 async def list_all_jobs(
+    request: Request,
     search_term: str | None = Query(None, description="A search term to filter jobs by"),
     location: str | None = Query(None, description="The location to search for"),
     remote: bool | None = Query(None, description="Whether to search for remote jobs"),
@@ -35,19 +185,78 @@ async def list_all_jobs(
     salary_max: int | None = Query(None, description="The maximum salary to search for"),
     salary_unit: str | None = Query(None, description="The salary unit to search for"),
     salary_per: SalaryPer | None = Query(None, description="The salary period to search for"),
+    annual_salary_min: int | None = Query(
+        None, description="The minimum yearly salary in the base currency to search for"
+    ),
+    annual_salary_max: int | None = Query(
+        None, description="The maximum yearly salary in the base currency to search for"
+    ),
     requirements_met: bool | None = Query(None, description="Whether to search for jobs with skill requirements met"),
+    limit: int | None = Query(None, ge=1, le=1000, description="The maximum number of jobs to return"),
+    cursor: str | None = Query(None, description="The `X-Next-Cursor` header of the previous page"),
+    stream: bool = Query(False, description="Whether to stream the jobs as newline delimited json"),
     user: User | None = public_auth,
 ) -> Any:
     """
-    Return a list of all jobs.
+    Return a list of all jobs, ordered by last update (newest first). If a `search_term` is given, jobs are ordered by
+    relevance first. The words of the search term must all match the beginning of words in the title, description or
+    responsibilities (e.g. `develop` finds `Python Developer`), except for words the full-text index does not contain
+    (on MySQL: words shorter than three characters and common stop words like `of`). Search terms shorter than three
+    characters, terms consisting only of such words, or all terms if full-text search is disabled are matched as
+    substrings instead.
+
+    If `limit` is set and there are more jobs, the `X-Next-Cursor` response header contains a cursor which can be passed
+    to the next request to fetch the following page.
+
+    If `stream` is set or the `Accept` header is `application/x-ndjson`, jobs are streamed as newline delimited json
+    (one job per line) while they are read from the database. This is intended for full exports: no `X-Next-Cursor`
+    header is returned in this mode, so `limit` only caps the number of jobs. The jobs are read after the response
+    headers have been sent, so the `Server-Timing` header does not include these statements.
+
+    `annual_salary_min` and `annual_salary_max` compare yearly salaries converted to the base currency, so they work
+    across different currencies and salary periods. Jobs with an unknown currency or a salary that is paid once or per
+    task are excluded by these filters.
 
     Contact details are included iff the **VERIFIED** requirement is met and the user has completed the required skills.
+
+    Responses carry an `ETag` header. If it matches the `If-None-Match` request header, `304 Not Modified` is returned.
     """
 
     levels = await get_skill_levels(user.id) if user else {}
-
-    query = select(models.Job)
-    if search_term:
+    admin = bool(user and user.admin)
+    params = _normalize_params(
+        search_term=search_term,
+        location=location,
+        remote=remote,
+        type=type,
+        professional_level=professional_level,
+        salary_min=salary_min or None,
+        salary_max=salary_max or None,
+        salary_unit=salary_unit,
+        salary_per=salary_per,
+        annual_salary_min=annual_salary_min,
+        annual_salary_max=annual_salary_max,
+        requirements_met=requirements_met,
+        limit=limit,
+        cursor=cursor,
+    )
+    fingerprint = _fingerprint(levels, admin)
+    stream = stream or "application/x-ndjson" in request.headers.get("Accept", "")
+
+    generation = await read_generation("jobs")
+    etag = make_etag(generation, params, fingerprint, stream)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    query = _with_relationships(select(models.Job))
+    order: list[ColumnElement[Any]] = [models.Job.last_update, models.Job.id]
+    ranked = False
+    if search_term and (fulltext := _fulltext_search(search_term)):
+        match, rank = fulltext
+        query = query.where(match).options(with_expression(models.Job.search_rank, rank))
+        order.insert(0, rank)
+        ranked = True
+    elif search_term:
         query = query.where(
             or_(
                 func.lower(models.Job.title).contains(search_term.lower(), autoescape=True),
@@ -71,38 +280,79 @@ async def list_all_jobs(
         query = query.where(func.lower(models.Job.salary_unit).contains(salary_unit.lower(), autoescape=True))
     if salary_per:
         query = query.where(models.Job.salary_per == salary_per)
-
-    return [
-        await job.serialize(include_contact=(user and user.admin) or ok)
-        async for job in await db.stream(query)
-        if (
-            ok := all(
-                levels.get(requirement.skill_id, 0) >= requirement.level for requirement in job.skill_requirements
-            )
+    if annual_salary_min is not None:
+        query = query.where(models.Job.annual_salary_max >= annual_salary_min)
+    if annual_salary_max is not None:
+        query = query.where(models.Job.annual_salary_min <= annual_salary_max)
+    if requirements_met is not None:
+        query = query.where(_requirements_met(levels) if requirements_met else not_(_requirements_met(levels)))
+    if cursor:
+        if not (position := _decode_cursor(cursor, ranked)):
+            raise InvalidCursorError
+        query = query.where(_after(order, position))
+
+    query = query.order_by(*(expr.desc() for expr in order))
+    if stream:
+        if limit is not None:
+            query = query.limit(limit)
+        return StreamingResponse(
+            _stream_jobs(query, levels=levels, requirements_met=requirements_met, admin=admin),
+            media_type="application/x-ndjson",
+            headers=etag_headers(etag),
+        )
+    if limit is not None and limit > settings.jobs_cache_max_limit:
+        # large explicit pages are rarely requested twice and would only fill up the cache
+        body, next_cursor = await _render_jobs(
+            query.limit(limit + 1),
+            ranked=ranked,
+            limit=limit,
+            levels=levels,
+            requirements_met=requirements_met,
+            admin=admin,
         )
-        is requirements_met
-        or requirements_met is None
-    ]
+    else:
+        body, next_cursor = await _render_jobs_cached(
+            params,
+            fingerprint,
+            query.limit(limit + 1) if limit is not None else query,
+            ranked=ranked,
+            limit=limit,
+            levels=levels,
+            requirements_met=requirements_met,
+            admin=admin,
+        )
+    headers = etag_headers(etag)
+    if next_cursor:
+        # browsers only let cross-origin clients read this header if it is exposed explicitly
+        headers["X-Next-Cursor"] = next_cursor
+        headers["Access-Control-Expose-Headers"] = "X-Next-Cursor"
+    return Response(body, media_type="application/json", headers=headers)
 
 
-@router.get("/jobs/{job_id}", responses=responses(Job, JobNotFoundError))
-async def get_job(job_id: str, user: User | None = public_auth) -> Any:
+@router.get("/jobs/{job_id}", responses=responses(Job, JobNotFoundError) | NOT_MODIFIED)
+async def get_job(job_id: str, request: Request, user: User | None = public_auth) -> Any:
     """
     Return details about a specific job.
 
     Contact details are included iff the **VERIFIED** requirement is met and the user has completed the required skills.
+
+    Responses carry an `ETag` header. If it matches the `If-None-Match` request header, `304 Not Modified` is returned.
     """
 
-    job = await db.get(models.Job, id=job_id)
+    levels = await get_skill_levels(user.id) if user else {}
+    # the generation changes whenever a job or company is modified, which also covers the embedded company
+    generation = await read_generation("jobs")
+
+    job = await db.first(_with_relationships(filter_by(models.Job, id=job_id)))
     if not job:
         raise JobNotFoundError
 
-    levels = await get_skill_levels(user.id) if user else {}
+    include_contact = bool(user and user.admin) or _meets_requirements(job, levels)
+    etag = make_etag(generation, job_id, job.last_update.isoformat(), include_contact)
+    if etag_matches(request, etag):
+        return not_modified(etag)
 
-    return await job.serialize(
-        include_contact=(user and user.admin)
-        or all(levels.get(requirement.skill_id, 0) >= requirement.level for requirement in job.skill_requirements)
-    )
+    return FastJSONResponse(await job.serialize(include_contact=include_contact), headers=etag_headers(etag))
 
 
 @router.post(
@@ -139,7 +389,12 @@ async def create_job(data: CreateJob) -> Any:
         skill_requirements=data.skill_requirements,
     )
     job.company = company
-    return await job.serialize(include_contact=True)
+    out = await job.serialize(include_contact=True)
+
+    await db.commit()
+    await clear_cache("jobs")
+
+    return FastJSONResponse(out)
 
 
 @router.patch(
@@ -154,7 +409,7 @@ async def update_job(job_id: str, data: UpdateJob) -> Any:
     *Requirements:* **ADMIN**
     """
 
-    job = await db.get(models.Job, id=job_id)
+    job = await db.first(_with_relationships(filter_by(models.Job, id=job_id)))
     if not job:
         raise JobNotFoundError
 
@@ -162,7 +417,7 @@ async def update_job(job_id: str, data: UpdateJob) -> Any:
         company = await db.get(models.Company, id=data.company_id)
         if not company:
             raise CompanyNotFoundError
-        job.company_id = data.company_id
+        job.company = company
 
     if data.title is not None and data.title != job.title:
         job.title = data.title
@@ -190,6 +445,7 @@ async def update_job(job_id: str, data: UpdateJob) -> Any:
         job.salary_max = data.salary.max
         job.salary_unit = data.salary.unit
         job.salary_per = data.salary.per
+        job.update_annual_salary()
 
     if data.contact is not None and data.contact != job.contact:
         job.contact = data.contact
@@ -204,8 +460,12 @@ async def update_job(job_id: str, data: UpdateJob) -> Any:
         ]
 
     job.last_update = utcnow()
+    out = await job.serialize(include_contact=True)
+
+    await db.commit()
+    await clear_cache("jobs")
 
-    return await job.serialize(include_contact=True)
+    return FastJSONResponse(out)
 
 
 @router.delete("/jobs/{job_id}", dependencies=[admin_auth], responses=admin_responses(bool, JobNotFoundError))
@@ -216,9 +476,11 @@ async def delete_job(job_id: str) -> Any:
     *Requirements:* **ADMIN**
     """
 
-    job = await db.get(models.Job, id=job_id)
-    if not job:
+    await db.bulk_delete(delete(models.SkillRequirement).where(models.SkillRequirement.job_id == job_id))
+    if not await db.bulk_delete(delete(models.Job).where(models.Job.id == job_id)):
         raise JobNotFoundError
 
-    await db.delete(job)
+    await db.commit()
+    await clear_cache("jobs")
+
     return True
@@ -13,3 +13,9 @@ class SkillNotFoundError(APIException):
     status_code = status.HTTP_404_NOT_FOUND
     detail = "Skill not found"
     description = "This skill does not exist."
+
+
+class InvalidCursorError(APIException):
+    status_code = status.HTTP_400_BAD_REQUEST
+    detail = "Invalid cursor"
+    description = "This pagination cursor is malformed."
@@ -24,7 +24,7 @@ class Company(Base):
     twitter_handle: Mapped[str | None] = Column(String(255), nullable=True)
     instagram_handle: Mapped[str | None] = Column(String(255), nullable=True)
     logo_url: Mapped[str | None] = Column(String(255), nullable=True)
-    jobs: list[Job] = relationship("Job", back_populates="company", cascade="all, delete-orphan")
+    jobs: list[Job] = relationship("Job", back_populates="company", cascade="all, delete-orphan", lazy="raise_on_sql")
 
     @property
     def serialize(self) -> dict[str, Any]:
@@ -2,15 +2,36 @@ from __future__ import annotations
 
 import enum
 import json
+import re
 from datetime import datetime
-from typing import TYPE_CHECKING, Any, cast
+from typing import TYPE_CHECKING, Any
 from uuid import uuid4
 
-from sqlalchemy import BigInteger, Boolean, Column, Enum, ForeignKey, String, Text
-from sqlalchemy.orm import Mapped, relationship
+from sqlalchemy import (
+    DDL,
+    BigInteger,
+    Boolean,
+    Column,
+    Enum,
+    ForeignKey,
+    Index,
+    String,
+    Text,
+    column,
+    event,
+    func,
+    literal_column,
+)
+from sqlalchemy import select as sa_select
+from sqlalchemy import table
+from sqlalchemy.dialects.mysql import match  # type: ignore[attr-defined]
+from sqlalchemy.orm import Mapped, query_expression, relationship
+from sqlalchemy.sql import ColumnElement
 
 from ..database.database import UTCDateTime
 from ..services.skills import get_skills
+from ..settings import settings
+from ..utils.fast_json import loads
 from ..utils.utc import utcnow
 from api.database import Base, db
 from api.models.companies import Company
@@ -18,6 +39,7 @@ from api.models.companies import Company
 
 if TYPE_CHECKING:
     from . import SkillRequirement
+    from ..services.skills import Skill
 
 
 class JobType(enum.Enum):
@@ -44,12 +66,39 @@ class SalaryPer(enum.Enum):
     YEAR = "year"
 
 
+def annual_salary_factor(unit: str, per: SalaryPer) -> float | None:
+    """
+    Return the factor which converts a salary to a yearly salary in the base currency.
+
+    :param unit: the currency of the salary
+    :param per: the period of time the salary is paid for
+    :return: the factor, or None if the currency is unknown or the period cannot be annualized
+    """
+
+    rates = {currency.strip().upper(): rate for currency, rate in settings.salary_exchange_rates.items()}
+    rates.setdefault(settings.salary_base_currency.strip().upper(), 1)
+    rate = rates.get(unit.strip().upper())
+    periods = settings.salary_periods_per_year.get(per.value)
+    if rate is None or periods is None:
+        return None
+    return rate * periods
+
+
+# InnoDB does not index words shorter than innodb_ft_min_token_size (default 3) or in its default stopword list, so
+# such words can never be required in a full-text search
+MYSQL_FT_MIN_TOKEN_SIZE = 3
+MYSQL_FT_STOPWORDS = frozenset(
+    "a about an are as at be by com de en for from how i in is it la of on or that the this to was what when where who"
+    " will with und www".split()
+)
+
+
 class Job(Base):
     __tablename__ = "jobs_jobs"
 
     id: Mapped[str] = Column(String(36), primary_key=True, unique=True)
     company_id: Mapped[str] = Column(String(36), ForeignKey("jobs_companies.id"))
-    company: Mapped[Company] = relationship("Company", back_populates="jobs", lazy="selectin")
+    company: Mapped[Company] = relationship("Company", back_populates="jobs", lazy="raise_on_sql")
     title: Mapped[str] = Column(Text)
     description: Mapped[str] = Column(Text)
     location: Mapped[str] = Column(Text)
@@ -61,22 +110,92 @@ class Job(Base):
     salary_max: Mapped[int] = Column(BigInteger)
     salary_unit: Mapped[str] = Column(Text)
     salary_per: Mapped[SalaryPer] = Column(Enum(SalaryPer))
+    annual_salary_min: Mapped[int | None] = Column(BigInteger, nullable=True)
+    annual_salary_max: Mapped[int | None] = Column(BigInteger, nullable=True)
     contact: Mapped[str] = Column(Text)
     last_update: Mapped[datetime] = Column(UTCDateTime)
     skill_requirements: list[SkillRequirement] = relationship(
-        "SkillRequirement", back_populates="job", cascade="all, delete-orphan", lazy="selectin"
+        "SkillRequirement", back_populates="job", cascade="all, delete-orphan", lazy="raise_on_sql"
     )
+    search_rank: Mapped[float | None] = query_expression()
+
+    # parsed value of _responsibilities, keyed by the identity of the raw string (so it is invalidated on reload)
+    _responsibilities_cache: tuple[str, tuple[str, ...]] | None = None
 
     @property
     def responsibilities(self) -> list[str]:
-        return cast(list[str], json.loads(self._responsibilities)) if self._responsibilities else []
+        if not self._responsibilities:
+            return []
+        if (cache := self._responsibilities_cache) is None or cache[0] is not self._responsibilities:
+            cache = self._responsibilities_cache = (self._responsibilities, tuple(loads(self._responsibilities)))
+        return list(cache[1])
 
     @responsibilities.setter
     def responsibilities(self, value: list[str]) -> None:
         self._responsibilities = json.dumps(value)
+        self._responsibilities_cache = (self._responsibilities, tuple(value))
+
+    def update_annual_salary(self) -> None:
+        """Recompute the normalized salary columns (yearly, in the base currency) from the salary columns."""
+
+        factor = annual_salary_factor(self.salary_unit, self.salary_per)
+        self.annual_salary_min = round(self.salary_min * factor) if factor is not None else None
+        self.annual_salary_max = round(self.salary_max * factor) if factor is not None else None
+
+    @classmethod
+    def fulltext_search(cls, dialect: str, term: str) -> tuple[ColumnElement[Any], ColumnElement[Any]] | None:
+        """
+        Build a full-text search over title, description and responsibilities.
+
+        Jobs match if they contain a word starting with each of the words of the search term (so "develop" finds
+        "Python developer", but "eloper" does not). The required indexes are created by the alembic migrations and
+        by :meth:`sqlalchemy.schema.MetaData.create_all` (see `FULLTEXT_DDL`). On MySQL, words which are not indexed
+        (see `MYSQL_FT_STOPWORDS`) are ignored.
+
+        :param dialect: the name of the database dialect
+        :param term: the search term
+        :return: a filter clause and a relevance expression (higher is better), or None if not supported
+        """
+
+        if not (words := re.findall(r"\w+", term)):
+            return None
+
+        if dialect == "mysql":
+            words = [
+                word
+                for word in words
+                if len(word) >= MYSQL_FT_MIN_TOKEN_SIZE and word.lower() not in MYSQL_FT_STOPWORDS
+            ]
+            if not words:
+                return None
+            expr = match(
+                cls.title, cls.description, cls._responsibilities, against=" ".join(f"+{word}*" for word in words)
+            ).in_boolean_mode()
+            return expr > 0, expr
+
+        if dialect == "postgresql":
+            document = literal_column(
+                "to_tsvector('simple', coalesce(jobs_jobs.title, '') || ' ' || coalesce(jobs_jobs.description, '')"
+                " || ' ' || coalesce(jobs_jobs._responsibilities, ''))"
+            )
+            query = func.to_tsquery(literal_column("'simple'"), " & ".join(f"{word}:*" for word in words))
+            return document.op("@@")(query), func.ts_rank(document, query)
+
+        if dialect == "sqlite":
+            fts = table("jobs_jobs_fts", column("rowid"))
+            rowid = literal_column("jobs_jobs.rowid")
+            matches = literal_column("jobs_jobs_fts").op("MATCH")(" ".join(f'"{word}"*' for word in words))
+            rank = sa_select(-func.bm25(literal_column("jobs_jobs_fts"))).where(matches, fts.c.rowid == rowid)
+            return rowid.in_(sa_select(fts.c.rowid).where(matches)), rank.scalar_subquery()
+
+        return None
 
     async def serialize(self, *, include_contact: bool) -> dict[str, Any]:
-        skills = await get_skills()
+        return self.serialize_with_skills(await get_skills(), include_contact=include_contact)
+
+    def serialize_with_skills(self, skills: dict[str, Skill], *, include_contact: bool) -> dict[str, Any]:
+        """Serialize this job using an already resolved skills map (see :func:`api.services.skills.get_skills`)."""
+
         return {
             "id": self.id,
             "company": self.company.serialize,
@@ -145,5 +264,49 @@ class Job(Base):
             last_update=utcnow(),
         )
         job.responsibilities = responsibilities
+        job.update_annual_salary()
         await db.add(job)
         return job
+
+
+Index("ix_jobs_jobs_last_update_id", Job.last_update, Job.id)
+Index("ix_jobs_jobs_company_id", Job.company_id)
+# equality filters of the job list, followed by its (keyset) sort order
+Index("ix_jobs_jobs_remote_last_update_id", Job.remote, Job.last_update, Job.id)
+Index("ix_jobs_jobs_type_last_update_id", Job.type, Job.last_update, Job.id)
+Index("ix_jobs_jobs_professional_level_last_update_id", Job.professional_level, Job.last_update, Job.id)
+Index("ix_jobs_jobs_salary_per_last_update_id", Job.salary_per, Job.last_update, Job.id)
+# range filters of the job list
+Index("ix_jobs_jobs_salary_min", Job.salary_min)
+Index("ix_jobs_jobs_salary_max", Job.salary_max)
+Index("ix_jobs_jobs_annual_salary_min", Job.annual_salary_min)
+Index("ix_jobs_jobs_annual_salary_max", Job.annual_salary_max)
+
+
+_FTS_COLUMNS = "title, description, _responsibilities"
+_FTS_NEW = "new.rowid, new.title, new.description, new._responsibilities"
+_FTS_OLD = "'delete', old.rowid, old.title, old.description, old._responsibilities"
+
+# full-text indexes used by Job.fulltext_search, which cannot be declared as regular indexes
+FULLTEXT_DDL: dict[str, list[str]] = {
+    "mysql": [f"CREATE FULLTEXT INDEX ix_jobs_jobs_fulltext ON jobs_jobs ({_FTS_COLUMNS})"],
+    "postgresql": [
+        "CREATE INDEX ix_jobs_jobs_fulltext ON jobs_jobs USING gin (to_tsvector('simple', coalesce(title, '') || ' ' "
+        "|| coalesce(description, '') || ' ' || coalesce(_responsibilities, '')))"
+    ],
+    "sqlite": [
+        f"CREATE VIRTUAL TABLE jobs_jobs_fts USING fts5({_FTS_COLUMNS}, content='jobs_jobs', content_rowid='rowid')",
+        "CREATE TRIGGER jobs_jobs_fts_insert AFTER INSERT ON jobs_jobs BEGIN "
+        f"INSERT INTO jobs_jobs_fts(rowid, {_FTS_COLUMNS}) VALUES ({_FTS_NEW}); END",
+        "CREATE TRIGGER jobs_jobs_fts_delete AFTER DELETE ON jobs_jobs BEGIN "
+        f"INSERT INTO jobs_jobs_fts(jobs_jobs_fts, rowid, {_FTS_COLUMNS}) VALUES ({_FTS_OLD}); END",
+        "CREATE TRIGGER jobs_jobs_fts_update AFTER UPDATE ON jobs_jobs BEGIN "
+        f"INSERT INTO jobs_jobs_fts(jobs_jobs_fts, rowid, {_FTS_COLUMNS}) VALUES ({_FTS_OLD}); "
+        f"INSERT INTO jobs_jobs_fts(rowid, {_FTS_COLUMNS}) VALUES ({_FTS_NEW}); END",
+    ],
+}
+
+for _dialect, _statements in FULLTEXT_DDL.items():
+    for _statement in _statements:
+        event.listen(Job.__table__, "after_create", DDL(_statement).execute_if(dialect=_dialect))
+event.listen(Job.__table__, "after_drop", DDL("DROP TABLE IF EXISTS jobs_jobs_fts").execute_if(dialect="sqlite"))
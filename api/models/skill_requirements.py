@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from sqlalchemy import Column, ForeignKey, Integer, String
+from sqlalchemy import Column, ForeignKey, Index, Integer, String
 from sqlalchemy.orm import Mapped, relationship
 
 from api.database import Base
@@ -11,6 +11,9 @@ class SkillRequirement(Base):
     __tablename__ = "jobs_skill_requirements"
 
     job_id: Mapped[str] = Column(String(36), ForeignKey("jobs_jobs.id"), primary_key=True)
-    job: Mapped[Job] = relationship("Job", back_populates="skill_requirements", lazy="selectin")
+    job: Mapped[Job] = relationship("Job", back_populates="skill_requirements", lazy="raise_on_sql")
     skill_id: Mapped[str] = Column(String(36), primary_key=True)
     level: Mapped[int] = Column(Integer)
+
+
+Index("ix_jobs_skill_requirements_skill_id", SkillRequirement.skill_id)
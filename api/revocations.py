@@ -0,0 +1,104 @@
+import asyncio
+from typing import Any
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from .logger import get_logger
+from .redis import auth_redis
+from .settings import settings
+
+
+logger = get_logger(__name__)
+
+PREFIX = "session_logout:"
+REMOVE_EVENTS = {"del", "expired", "evicted", "rename_from"}
+
+
+class RevokedSessions:
+    """
+    Local copy of the revoked sessions (`session_logout:<refresh token>` keys in the auth redis).
+
+    While the listener is running, the copy is kept up to date by keyspace notifications, so revocation checks do not
+    need a redis round trip. Otherwise (or if keyspace notifications are disabled) the keys are looked up directly.
+    """
+
+    def __init__(self, redis: Redis) -> None:
+        self.redis: Redis = redis
+        self.ready: bool = False
+        self._revoked: set[str] = set()
+        self._task: asyncio.Task[None] | None = None
+
+    async def is_revoked(self, rt: str) -> bool:
+        """Return whether the session of a refresh token has been revoked."""
+
+        if self.ready:
+            return rt in self._revoked
+        return bool(await self.redis.exists(PREFIX + rt))
+
+    def start(self) -> None:
+        """Start the listener in a background task."""
+
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the listener and fall back to looking up the keys directly."""
+
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self._reset()
+
+    def _reset(self) -> None:
+        self.ready = False
+        self._revoked.clear()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self._listen()
+            except RedisError as e:
+                logger.warning(f"Revoked sessions listener failed: {e}")
+            except Exception:
+                logger.exception("Revoked sessions listener failed")
+            self._reset()
+            await asyncio.sleep(settings.revoked_sessions_retry_interval)
+
+    async def _listen(self) -> None:
+        if not await self._notifications_enabled():
+            logger.warning("Keyspace notifications are disabled in the auth redis, revoked sessions are not cached")
+            return
+
+        db = self.redis.connection_pool.connection_kwargs.get("db", 0)
+        channel = f"__keyspace@{db}__:"
+        async with self.redis.pubsub() as pubsub:
+            await pubsub.psubscribe(channel + PREFIX + "*")
+
+            # load existing keys after subscribing, so no changes are missed
+            async for key in self.redis.scan_iter(match=PREFIX + "*", count=1000):
+                self._revoked.add(key.removeprefix(PREFIX))
+            self.ready = True
+            logger.debug(f"Loaded {len(self._revoked)} revoked sessions")
+
+            async for message in pubsub.listen():
+                self._handle(message, channel)
+
+    async def _notifications_enabled(self) -> bool:
+        flags: str = (await self.redis.config_get("notify-keyspace-events")).get("notify-keyspace-events", "")
+        return "K" in flags and ("A" in flags or all(c in flags for c in "g$x"))
+
+    def _handle(self, message: dict[str, Any], channel: str) -> None:
+        if message["type"] != "pmessage":
+            return
+
+        rt = message["channel"].removeprefix(channel + PREFIX)
+        if message["data"] in REMOVE_EVENTS:
+            self._revoked.discard(rt)
+        else:
+            self._revoked.add(rt)
+
+
+# global revoked sessions cache
+revoked_sessions = RevokedSessions(auth_redis)
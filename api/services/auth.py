@@ -1,9 +1,9 @@
 from api.services.internal import InternalService
+from api.settings import settings
 from api.utils.cache import redis_cached
 
 
-@redis_cached("user", "user_id")
+@redis_cached("user", "user_id", soft_ttl=settings.cache_soft_ttl)
 async def exists_user(user_id: str) -> bool:
-    async with InternalService.AUTH.client as client:
-        response = await client.get(f"/users/{user_id}")
-        return response.status_code == 200
+    response = await InternalService.AUTH.client.get(f"/users/{user_id}")
+    return response.status_code == 200
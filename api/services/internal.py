@@ -1,7 +1,8 @@
+import time
 from datetime import timedelta
 from enum import Enum
 
-from httpx import AsyncClient, Response
+from httpx import AsyncClient, Limits, Request, Response, Timeout
 
 from api.logger import get_logger
 from api.settings import settings
@@ -20,7 +21,18 @@ class InternalService(Enum):
     SKILLS = settings.skills_url
 
     def _get_token(self) -> str:
-        return encode_jwt({"aud": self.name.lower()}, timedelta(seconds=settings.internal_jwt_ttl))
+        """Get a signed token for this service, which is reused until shortly before it expires."""
+
+        now = time.monotonic()
+        if (cached := _tokens.get(self)) is not None and cached[0] - settings.internal_jwt_refresh_margin > now:
+            return cached[1]
+
+        token = encode_jwt({"aud": self.name.lower()}, timedelta(seconds=settings.internal_jwt_ttl))
+        _tokens[self] = now + settings.internal_jwt_ttl, token
+        return token
+
+    async def _add_token(self, request: Request) -> None:
+        request.headers["Authorization"] = self._get_token()
 
     @classmethod
     async def _handle_error(cls, response: Response) -> None:
@@ -28,10 +40,42 @@ class InternalService(Enum):
             await response.aread()
             raise InternalServiceError(response, response.text)
 
-    @property
-    def client(self) -> AsyncClient:
+    def _create_client(self) -> AsyncClient:
         return AsyncClient(
             base_url=self.value.rstrip("/") + "/_internal",
-            headers={"Authorization": self._get_token()},
-            event_hooks={"response": [self._handle_error]},
+            event_hooks={"request": [self._add_token], "response": [self._handle_error]},
+            limits=Limits(
+                max_connections=settings.internal_max_connections,
+                max_keepalive_connections=settings.internal_max_keepalive_connections,
+                keepalive_expiry=settings.internal_keepalive_expiry,
+            ),
+            timeout=Timeout(settings.internal_timeout),
         )
+
+    @property
+    def client(self) -> AsyncClient:
+        """Get the shared (pooled, keep-alive) http client for this service."""
+
+        if (client := _clients.get(self)) is None or client.is_closed:
+            client = _clients[self] = self._create_client()
+        return client
+
+    @classmethod
+    def open_clients(cls) -> None:
+        """Create the shared http clients for all services."""
+
+        for service in cls:
+            logger.debug(f"creating http client for {service.name.lower()} service")
+            _ = service.client
+
+    @classmethod
+    async def close_clients(cls) -> None:
+        """Close the shared http clients of all services."""
+
+        while _clients:
+            _, client = _clients.popitem()
+            await client.aclose()
+
+
+_clients: dict[InternalService, AsyncClient] = {}
+_tokens: dict[InternalService, tuple[float, str]] = {}
@@ -1,9 +1,11 @@
-from typing import cast
+import asyncio
+from typing import Iterable, cast
 
 from pydantic import BaseModel, Extra
 
 from api.services.internal import InternalService
-from api.utils.cache import redis_cached
+from api.settings import settings
+from api.utils.cache import redis_cached, redis_cached_batch
 
 
 class Skill(BaseModel):
@@ -14,15 +16,30 @@ class Skill(BaseModel):
         extra = Extra.ignore
 
 
-@redis_cached("skills")
+@redis_cached("skills", soft_ttl=settings.cache_soft_ttl, local_ttl=settings.local_cache_ttl, lock=True)
 async def get_skills() -> dict[str, Skill]:
-    async with InternalService.SKILLS.client as client:
-        response = await client.get("/skills")
-        return {skill.id: skill for skill in map(Skill.parse_obj, response.json())}
+    response = await InternalService.SKILLS.client.get("/skills")
+    return {skill.id: skill for skill in map(Skill.parse_obj, response.json())}
 
 
-@redis_cached("user_skills", "user_id")
+@redis_cached("user_skills", "user_id", local_ttl=settings.local_cache_ttl)
 async def get_skill_levels(user_id: str) -> dict[str, int]:
-    async with InternalService.SKILLS.client as client:
-        response = await client.get(f"/skills/{user_id}")
-        return cast(dict[str, int], response.json())
+    response = await InternalService.SKILLS.client.get(f"/skills/{user_id}")
+    return cast(dict[str, int], response.json())
+
+
+async def _fetch_skill_levels(user_ids: list[str]) -> dict[str, dict[str, int]]:
+    semaphore = asyncio.Semaphore(settings.skill_levels_batch_concurrency)
+
+    async def fetch(user_id: str) -> tuple[str, dict[str, int]]:
+        async with semaphore:
+            response = await InternalService.SKILLS.client.get(f"/skills/{user_id}")
+        return user_id, cast(dict[str, int], response.json())
+
+    return dict(await asyncio.gather(*map(fetch, user_ids)))
+
+
+async def get_skill_levels_batch(user_ids: Iterable[str]) -> dict[str, dict[str, int]]:
+    """Fetch the skill levels of many users. Cache entries are shared with :func:`get_skill_levels`."""
+
+    return await redis_cached_batch(get_skill_levels, _fetch_skill_levels, user_ids)
@@ -1,19 +1,210 @@
+import asyncio
 import base64
 import inspect
+import math
 import pickle  # noqa: S403
+import time
+from collections import OrderedDict
 from functools import wraps
-from typing import Any, Awaitable, Callable, TypeVar, cast
+from typing import Any, Awaitable, Callable, Generic, Hashable, Iterable, NamedTuple, Protocol, TypeVar, cast
+from uuid import uuid4
 
-from api.redis import redis
+from redis.asyncio.lock import Lock
+from redis.exceptions import LockError
+
+from api.database import db
+from api.logger import get_logger
+from api.redis import redis_binary
 from api.settings import settings
 
 
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
 T = TypeVar("T")
+K = TypeVar("K", bound=Hashable)
+
+logger = get_logger(__name__)
+
+_MISSING: Any = object()
+
+
+class LocalCache(Generic[T]):
+    """Size bounded in-process LRU cache with a time to live for each entry."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize: int = maxsize
+        self._data: OrderedDict[str, tuple[float, T]] = OrderedDict()
+
+    def get(self, key: str, default: T | None = None) -> T | None:
+        """Return the cached value for a key, or the default value if the key is missing or has expired."""
+
+        if (entry := self._data.get(key)) is None:
+            return default
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            return default
+
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: T, ttl: float) -> None:
+        """Store a value and evict the least recently used entries if the cache is full."""
+
+        self._data[key] = time.monotonic() + ttl, value
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+
+_local_caches: dict[str, list[LocalCache[Any]]] = {}
+_pending: dict[str, asyncio.Task[Any]] = {}
+
+
+class Codec(Protocol):
+    """Serialization format of cached values."""
+
+    def dumps(self, value: Any) -> bytes:
+        """Serialize a value."""
+
+    def loads(self, data: bytes) -> Any:
+        """Deserialize a value."""
+
+
+class PickleCodec:
+    """Supports arbitrary python objects."""
+
+    def dumps(self, value: Any) -> bytes:
+        return pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def loads(self, data: bytes) -> Any:
+        return pickle.loads(data)  # noqa: S301
+
+
+class MsgpackCodec:
+    """Only supports json-like values (tuples are decoded as lists). Requires the optional msgpack package."""
+
+    def __init__(self) -> None:
+        if msgpack is None:
+            raise RuntimeError("msgpack is not installed")
+
+    def dumps(self, value: Any) -> bytes:
+        return cast(bytes, msgpack.packb(value, use_bin_type=True))
+
+    def loads(self, data: bytes) -> Any:
+        return msgpack.unpackb(data, raw=False, strict_map_key=False)
+
+
+PICKLE = PickleCodec()
+
+
+class CacheConfig(NamedTuple):
+    """Configuration of a function decorated with :func:`redis_cached`, available as its `cache_config` attribute."""
+
+    prefix: str
+    key: tuple[str, ...]
+    ttl: int
+    codec: Codec
+
+
+class _Entry(NamedTuple):
+    created_at: float
+    generation: str | None
+    value: Any
+
+
+def _encode(entry: _Entry, codec: Codec) -> bytes:
+    return codec.dumps(tuple(entry))
+
+
+def _decode(data: bytes | None, codec: Codec) -> _Entry | None:
+    if data is None:
+        return None
+    try:
+        created_at, generation, value = codec.loads(data)
+    except Exception:  # e.g. entries written in a different format
+        return None
+    return _Entry(created_at, generation, value)
+
+
+def _cache_key(prefix: str, func: Callable[..., Any], values: list[Any]) -> str:
+    ident = f"{func.__module__}:{func.__name__}"
+    return f"func_cache:{prefix}:{ident}:" + base64.b64encode(pickle.dumps(values)).decode().rstrip("=")
+
+
+def _generation_key(prefix: str) -> str:
+    return f"func_cache_gen:{prefix}"
+
+
+async def _get(key: str, prefix: str, codec: Codec) -> tuple[_Entry | None, str | None]:
+    """Fetch a cache entry and the current generation of its prefix. Entries of older generations are ignored."""
+
+    res, generation = await redis_binary.mget(key, _generation_key(prefix))
+    generation = generation and generation.decode()
+    if (entry := _decode(res, codec)) and entry.generation == generation:
+        return entry, generation
+    return None, generation
+
+
+def _start_task(key: str, load: Callable[[], Awaitable[T]]) -> asyncio.Task[T]:
+    """Start load() unless a task for the same key is already running in this process and return that task."""
+
+    if (task := _pending.get(key)) is None:
+        task = _pending[key] = asyncio.ensure_future(load())
+        task.add_done_callback(lambda _: _pending.pop(key, None))
+    return task
+
+
+async def _release_lock(redis_lock: Lock, key: str) -> None:
+    try:
+        await redis_lock.release()
+    except LockError:
+        logger.warning(f"lock for cache entry {key} expired before it was released")
+
+
+async def _wait_for_value(key: str, prefix: str, codec: Codec) -> _Entry | None:
+    """Poll redis for a value which is being computed by another process."""
+
+    deadline = time.monotonic() + settings.cache_lock_wait
+    while time.monotonic() < deadline:
+        await asyncio.sleep(0.1)
+        if (entry := (await _get(key, prefix, codec))[0]) is not None:
+            return entry
+    return None
 
 
 def redis_cached(
-    prefix: str, *key: str, ttl: int = settings.cache_ttl
+    prefix: str,
+    *key: str,
+    ttl: int = settings.cache_ttl,
+    soft_ttl: int | None = None,
+    local_ttl: float | None = None,
+    local_maxsize: int = settings.local_cache_size,
+    lock: bool = False,
+    codec: Codec = PICKLE,
 ) -> Callable[[Callable[..., Awaitable[T]]], Callable[..., Awaitable[T]]]:
+    """
+    Decorator which caches the results of an async function in redis.
+
+    :param prefix: the cache prefix, used to invalidate entries with :func:`clear_cache`
+    :param key: the names of the parameters the cache key is built from
+    :param ttl: the time to live of the redis entries
+    :param soft_ttl: if set, entries older than this are still returned immediately, but refreshed in the background
+    :param local_ttl: if set, also cache the results in process memory for this number of seconds (the cached objects
+                      are shared between callers and must not be modified)
+    :param local_maxsize: the maximum number of entries in the in-process cache
+    :param lock: if set, only one process recomputes a missing entry while the others wait for it (concurrent misses
+                 within one process are always coalesced)
+    :param codec: the serialization format of the cached values
+    """
+
     def decorator(func: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
         pos_cnt = 0
         param_indices: dict[str, int] = {}
@@ -23,26 +214,165 @@ def redis_cached(
                     param_indices[param.name] = pos_cnt
                 pos_cnt += 1
 
+        local_cache: LocalCache[T] | None = None
+        if local_ttl:
+            local_cache = LocalCache(local_maxsize)
+            _local_caches.setdefault(prefix, []).append(local_cache)
+
         @wraps(func)
         async def wrapper(*args: Any, **kwargs: Any) -> T:
-            ident = f"{func.__module__}:{func.__name__}"
-            k = f"func_cache:{prefix}:{ident}:" + base64.b64encode(
-                pickle.dumps(
-                    [args[i] if 0 <= (i := param_indices.get(arg, -1)) < len(args) else kwargs[arg] for arg in key]
-                )
-            ).decode().rstrip("=")
-            if res := await redis.get(k):
-                return cast(T, pickle.loads(base64.b64decode(res.encode())))  # noqa: S301
-
-            result = await func(*args, **kwargs)
-            await redis.setex(k, ttl, base64.b64encode(pickle.dumps(result)))
+            k = _cache_key(
+                prefix,
+                func,
+                [args[i] if 0 <= (i := param_indices.get(arg, -1)) < len(args) else kwargs[arg] for arg in key],
+            )
+            if local_cache and (value := local_cache.get(k, _MISSING)) is not _MISSING:
+                return cast(T, value)
+
+            async def compute(generation: str | None) -> T:
+                result = await func(*args, **kwargs)
+                await redis_binary.setex(k, ttl, _encode(_Entry(time.time(), generation, result), codec))
+                return result
+
+            async def refresh(generation: str | None) -> None:
+                redis_lock = redis_binary.lock(f"func_lock:{k}", timeout=settings.cache_lock_timeout)
+                if not await redis_lock.acquire(blocking=False):
+                    return  # another process is already refreshing this entry
+
+                try:
+                    await compute(generation)
+                except Exception:
+                    logger.exception(f"failed to refresh cache entry {k}")
+                finally:
+                    await _release_lock(redis_lock, k)
+
+            async def load() -> T:
+                entry, generation = await _get(k, prefix, codec)
+                if entry:
+                    if soft_ttl is not None and time.time() - entry.created_at >= soft_ttl:
+                        _start_task(f"refresh:{k}", lambda: refresh(generation))
+                    return cast(T, entry.value)
+                if not lock:
+                    return await compute(generation)
+
+                redis_lock = redis_binary.lock(f"func_lock:{k}", timeout=settings.cache_lock_timeout)
+                if not await redis_lock.acquire(blocking=False):
+                    if entry := await _wait_for_value(k, prefix, codec):
+                        return cast(T, entry.value)
+                    logger.warning(f"timed out waiting for cache entry {k}, computing it anyway")
+                    return await compute(generation)
+
+                try:
+                    return await compute(generation)
+                finally:
+                    await _release_lock(redis_lock, k)
+
+            result = await asyncio.shield(_start_task(k, load))
+            if local_cache and local_ttl:
+                local_cache.set(k, result, local_ttl)
             return result
 
+        wrapper.cache_config = CacheConfig(prefix, key, ttl, codec)  # type: ignore[attr-defined]
         return wrapper
 
     return decorator
 
 
+async def redis_cached_batch(
+    func: Callable[..., Awaitable[T]], load: Callable[[list[K]], Awaitable[dict[K, T]]], values: Iterable[K]
+) -> dict[K, T]:
+    """
+    Batch version of a function decorated with `redis_cached(prefix, <one key parameter>)` which shares its entries.
+
+    All entries are fetched with a single MGET, and only the missing values are passed to `load` at once. Their
+    results are written back in a single pipeline, using the prefix, ttl and codec of `func`. The in-process cache of
+    `func` is not used.
+
+    :param func: the decorated function
+    :param load: computes the results for a list of missing key values
+    :param values: the key values
+    :return: a dictionary which maps the key values to their results
+    """
+
+    config: CacheConfig | None = getattr(func, "cache_config", None)
+    if config is None or len(config.key) != 1:
+        raise ValueError("func must be decorated with redis_cached and exactly one key parameter")
+
+    keys = {value: _cache_key(config.prefix, func, [value]) for value in values}
+    if not keys:
+        return {}
+
+    *data, generation = await redis_binary.mget(*keys.values(), _generation_key(config.prefix))
+    generation = generation and generation.decode()
+    out: dict[K, T] = {}
+    for value, res in zip(keys, data):
+        if (entry := _decode(res, config.codec)) and entry.generation == generation:
+            out[value] = entry.value
+
+    if not (missing := [value for value in keys if value not in out]):
+        return out
+
+    loaded = await load(missing)
+    async with redis_binary.pipeline(transaction=False) as pipe:
+        for value, result in loaded.items():
+            pipe.setex(keys[value], config.ttl, _encode(_Entry(time.time(), generation, result), config.codec))
+        await pipe.execute()
+    return out | loaded
+
+
 async def clear_cache(prefix: str) -> None:
-    if keys := await redis.keys(f"func_cache:{prefix}:*"):
-        await redis.delete(*keys)
+    """
+    Invalidate all cache entries of a prefix.
+
+    This only replaces the generation of the prefix, so it takes constant time. Stale entries are ignored from now on
+    and expire on their own. In-process caches of other processes may serve stale values until their local ttl expires.
+    """
+
+    for local_cache in _local_caches.get(prefix, []):
+        local_cache.clear()
+    # the creation time is part of the generation, see generation_age()
+    await redis_binary.set(_generation_key(prefix), f"{uuid4().hex}:{time.time()}")
+
+
+async def get_generation(prefix: str) -> str:
+    """
+    Return the current generation of a prefix, which changes whenever clear_cache() is called for it.
+
+    This can be used as a cheap version token of everything cached under the prefix (e.g. for entity tags).
+    """
+
+    key = _generation_key(prefix)
+    if (generation := await redis_binary.get(key)) is None:
+        await redis_binary.set(key, uuid4().hex, nx=True)
+        generation = await redis_binary.get(key)
+    return cast(bytes, generation).decode()
+
+
+def generation_age(generation: str) -> float:
+    """
+    Return the number of seconds since a generation has been created by clear_cache(), i.e. since the last write.
+
+    Generations which have not been created by clear_cache() are infinitely old.
+    """
+
+    try:
+        return time.time() - float(generation.partition(":")[2])
+    except ValueError:
+        return math.inf
+
+
+async def read_generation(prefix: str) -> str:
+    """
+    Return the current generation of a prefix like get_generation() and make the current read-only database context
+    use the primary if the last write was less than `database_replica_max_lag` seconds ago, so that clients can read
+    their own writes although the read replicas may not have applied them yet.
+
+    The creation time of the generation comes from the clock of the process which wrote it, so clock skew between
+    hosts is added to (or subtracted from) the measured age and reduces the effective margin of
+    `database_replica_max_lag`.
+    """
+
+    generation = await get_generation(prefix)
+    if generation_age(generation) < settings.database_replica_max_lag:
+        db.use_primary()
+    return generation
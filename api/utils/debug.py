@@ -1,12 +1,11 @@
 import json
-from typing import Awaitable, Callable, Type
+from typing import Type
 
 import pydantic
-from fastapi import Request
-from fastapi.responses import StreamingResponse
 from fastapi.routing import APIRoute
 from pydantic import BaseModel
-from starlette.concurrency import iterate_in_threadpool
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from api.logger import get_logger
 
@@ -37,19 +36,32 @@ def _check_response_schema(method: str, route: APIRoute, status_code: int, body:
         logger.error(f"[{method} {route.path}] response schema validation failed ({status_code})")
 
 
-async def check_responses(
-    request: Request, call_next: Callable[..., Awaitable[StreamingResponse]]
-) -> StreamingResponse:
-    response: StreamingResponse = await call_next(request)
-    if response.headers.get("Content-type") != "application/json":
-        return response
+class CheckResponsesMiddleware:
+    """ASGI middleware which validates json responses against the response schemas of their routes."""
 
-    chunks = [chunk async for chunk in response.body_iterator]
-    body = b"".join(chunks)  # type: ignore
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
 
-    response.body_iterator = iterate_in_threadpool(iter(chunks))
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
 
-    if route := request.scope.get("route"):
-        _check_response_schema(request.method, route, response.status_code, body)
+        status_code = 0
+        chunks: list[bytes] | None = None
 
-    return response
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code, chunks
+
+            await send(message)
+
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if Headers(raw=message["headers"]).get("Content-type") == "application/json":
+                    chunks = []
+            elif message["type"] == "http.response.body" and chunks is not None:
+                chunks.append(message.get("body", b""))
+                if not message.get("more_body", False) and (route := scope.get("route")):
+                    _check_response_schema(scope["method"], route, status_code, b"".join(chunks))
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,37 @@
+import hashlib
+import json
+from typing import Any
+
+from fastapi import Request, Response
+
+
+# openapi documentation of the response to a matching If-None-Match header
+NOT_MODIFIED: dict[int | str, dict[str, Any]] = {304: {"description": "Not Modified"}}
+
+
+def make_etag(*parts: Any) -> str:
+    """Build a strong entity tag from a list of json serializable values."""
+
+    return '"' + hashlib.sha256(json.dumps(parts).encode()).hexdigest()[:32] + '"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Check whether the If-None-Match header of a request matches the given entity tag."""
+
+    if not (header := request.headers.get("If-None-Match")):
+        return False
+
+    tags = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return "*" in tags or etag in tags
+
+
+def etag_headers(etag: str) -> dict[str, str]:
+    """Return the headers of a response with an entity tag, which may depend on the authenticated user."""
+
+    return {"ETag": etag, "Vary": "Authorization"}
+
+
+def not_modified(etag: str) -> Response:
+    """Return a `304 Not Modified` response for an entity tag which matched the If-None-Match header."""
+
+    return Response(status_code=304, headers=etag_headers(etag))
@@ -0,0 +1,54 @@
+"""JSON encoding of job and company payloads without going through :func:`fastapi.encoders.jsonable_encoder`."""
+
+import json
+from enum import Enum
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+
+try:
+    import orjson
+except ImportError:
+    orjson = None  # type: ignore[assignment]
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, Enum):
+        return obj.value
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps_stdlib(content: Any) -> bytes:
+    """Like :func:`dumps`, but always uses the standard library."""
+
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":"), default=_default).encode()
+
+
+def dumps(content: Any) -> bytes:
+    """
+    Encode a payload consisting of json-like values, enums and sets as compact json.
+
+    Uses orjson if it is installed and falls back to the standard library otherwise.
+    """
+
+    if orjson is None:
+        return dumps_stdlib(content)
+    return orjson.dumps(content, default=_default)
+
+
+def loads(data: str | bytes) -> Any:
+    """Decode json. Uses orjson if it is installed and falls back to the standard library otherwise."""
+
+    if orjson is None:
+        return json.loads(data)
+    return orjson.loads(data)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response which encodes its content using :func:`dumps`."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,92 @@
+"""
+Compare the serialization formats of cached values.
+
+Usage: python -m benchmarks.cache_codecs [--redis]
+
+With --redis, the hit latency (GET + decode) is also measured against the redis server from the settings.
+"""
+
+import asyncio
+import base64
+import pickle  # noqa: S403
+import sys
+import timeit
+from typing import Any, Callable
+
+from api.redis import redis, redis_binary
+from api.services.skills import Skill
+from api.utils.cache import MsgpackCodec, PickleCodec
+
+
+def legacy_dumps(value: Any) -> str:
+    return base64.b64encode(pickle.dumps(value)).decode()
+
+
+def legacy_loads(data: str) -> Any:
+    return pickle.loads(base64.b64decode(data.encode()))  # noqa: S301
+
+
+FORMATS: dict[str, tuple[Callable[[Any], Any], Callable[[Any], Any]]] = {
+    "pickle+base64 (old)": (legacy_dumps, legacy_loads),
+    "pickle": (PickleCodec().dumps, PickleCodec().loads),
+}
+try:
+    FORMATS["msgpack"] = (MsgpackCodec().dumps, MsgpackCodec().loads)
+except RuntimeError:
+    pass
+
+VALUES: dict[str, Any] = {
+    "skills": {f"skill-{i}": Skill(id=f"skill-{i}", parent_id=f"parent-{i // 10}") for i in range(2000)},
+    "companies": [
+        {
+            "id": f"{i:08x}-0000-0000-0000-000000000000",
+            "name": f"Company {i}",
+            "description": "Lorem ipsum dolor sit amet, consetetur sadipscing elitr" * 4,
+            "website": f"https://company{i}.example.com",
+            "youtube_video": None,
+            "twitter_handle": f"company{i}",
+            "instagram_handle": None,
+            "logo_url": f"https://company{i}.example.com/logo.png",
+        }
+        for i in range(500)
+    ],
+}
+
+
+def bench(number: int, func: Callable[[], Any]) -> float:
+    return min(timeit.repeat(func, number=number, repeat=5)) / number * 1e6
+
+
+async def bench_redis(name: str, data: Any, loads: Callable[[Any], Any], number: int) -> float:
+    conn = redis if isinstance(data, str) else redis_binary
+    await conn.set(key := f"benchmark:{name}", data)
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    for _ in range(number):
+        loads(await conn.get(key))
+    await conn.delete(key)
+    return (loop.time() - start) / number * 1e6
+
+
+async def main() -> None:
+    with_redis = "--redis" in sys.argv
+    print(
+        f"{'value':<10} {'format':<20} {'size':>10} {'encode':>12} {'decode':>12}" + f" {'redis hit':>12}" * with_redis
+    )
+    for value_name, value in VALUES.items():
+        for format_name, (dumps, loads) in FORMATS.items():
+            try:
+                data = dumps(value)
+            except TypeError:
+                print(f"{value_name:<10} {format_name:<20} {'not supported':>10}")
+                continue
+
+            line = f"{value_name:<10} {format_name:<20} {len(data):>8} B"
+            line += f" {bench(20, lambda: dumps(value)):>9.1f} us {bench(20, lambda: loads(data)):>9.1f} us"
+            if with_redis:
+                line += f" {await bench_redis(format_name, data, loads, 200):>9.1f} us"
+            print(line)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
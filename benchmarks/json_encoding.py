@@ -0,0 +1,87 @@
+"""
+Compare the encoding of job list payloads via jsonable_encoder (old) and api.utils.fast_json.
+
+Usage: python -m benchmarks.json_encoding
+"""
+
+import json
+import timeit
+from datetime import datetime, timezone
+from importlib.util import find_spec
+from typing import Any, Callable
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from api import models
+from api.models.jobs import JobType, ProfessionalLevel, SalaryPer
+from api.services.skills import Skill
+from api.utils import fast_json
+
+
+SKILLS = {f"skill-{i}": Skill(id=f"skill-{i}", parent_id=f"parent-{i // 10}") for i in range(100)}
+
+
+def make_jobs(n: int) -> list[dict[str, Any]]:
+    company = models.Company(
+        id="00000000-0000-0000-0000-000000000000",
+        name="Company",
+        description="Lorem ipsum dolor sit amet, consetetur sadipscing elitr",
+        website="https://company.example.com",
+        logo_url="https://company.example.com/logo.png",
+    )
+    jobs = []
+    for i in range(n):
+        job = models.Job(
+            id=f"{i:08x}-0000-0000-0000-000000000000",
+            company=company,
+            title=f"Job {i}",
+            description="Lorem ipsum dolor sit amet, consetetur sadipscing elitr" * 8,
+            location="Remote",
+            remote=True,
+            type=JobType.FULL_TIME,
+            professional_level=ProfessionalLevel.JUNIOR,
+            salary_min=40000,
+            salary_max=60000,
+            salary_unit="EUR",
+            salary_per=SalaryPer.YEAR,
+            contact="jobs@company.example.com",
+            last_update=datetime.now(timezone.utc),
+            skill_requirements=[
+                models.SkillRequirement(skill_id=f"skill-{(i + j) % 100}", level=j + 1) for j in range(3)
+            ],
+        )
+        job.responsibilities = ["Lorem ipsum dolor sit amet"] * 4
+        jobs.append(job.serialize_with_skills(SKILLS, include_contact=True))
+    return jobs
+
+
+def old(out: Any) -> bytes:
+    return JSONResponse(jsonable_encoder(out)).body
+
+
+ENCODERS: dict[str, Callable[[Any], bytes]] = {
+    "jsonable_encoder (old)": old,
+    "fast_json (stdlib)": fast_json.dumps_stdlib,
+}
+if find_spec("orjson"):
+    ENCODERS["fast_json (orjson)"] = fast_json.dumps
+
+
+def bench(number: int, func: Callable[[], Any]) -> float:
+    return min(timeit.repeat(func, number=number, repeat=5)) / number * 1e3
+
+
+def main() -> None:
+    print(f"{'jobs':>6} {'encoder':<24} {'size':>10} {'time':>12}")
+    for n in [1000, 10000]:
+        out = make_jobs(n)
+        expected = json.loads(old(out))
+        for name, encode in ENCODERS.items():
+            data = encode(out)
+            assert json.loads(data) == expected
+            print(f"{n:>6} {name:<24} {len(data) // 1024:>7} KiB {bench(3, lambda: encode(out)):>9.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
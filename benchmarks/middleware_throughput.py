@@ -0,0 +1,83 @@
+"""
+Compare the request throughput of the previous BaseHTTPMiddleware based db_session / check_responses middlewares
+with the pure ASGI middlewares from api.app and api.utils.debug.
+
+Usage: python -m benchmarks.middleware_throughput [requests]
+"""
+
+import asyncio
+import sys
+import time
+from typing import Awaitable, Callable
+
+from fastapi import FastAPI, Request
+from fastapi.responses import Response, StreamingResponse
+from httpx import AsyncClient
+from starlette.concurrency import iterate_in_threadpool
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from api.app import DBSessionMiddleware
+from api.database import db_context
+from api.utils.debug import CheckResponsesMiddleware, _check_response_schema
+
+
+async def db_session(request: Request, call_next: Callable[[Request], Awaitable[Response]]) -> Response:
+    async with db_context():
+        return await call_next(request)
+
+
+async def check_responses(request: Request, call_next: Callable[[Request], Awaitable[Response]]) -> Response:
+    response: StreamingResponse = await call_next(request)  # type: ignore
+    if response.headers.get("Content-type") != "application/json":
+        return response
+
+    chunks = [chunk async for chunk in response.body_iterator]
+    body = b"".join(chunks)  # type: ignore
+    response.body_iterator = iterate_in_threadpool(iter(chunks))
+    if route := request.scope.get("route"):
+        _check_response_schema(request.method, route, response.status_code, body)
+    return response
+
+
+def create_app(asgi: bool, debug: bool) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/ping", responses={200: {"model": dict[str, bool]}})
+    async def ping() -> dict[str, bool]:
+        return {"ok": True}
+
+    if debug:
+        if asgi:
+            app.add_middleware(CheckResponsesMiddleware)
+        else:
+            app.add_middleware(BaseHTTPMiddleware, dispatch=check_responses)
+    if asgi:
+        app.add_middleware(DBSessionMiddleware)
+    else:
+        app.add_middleware(BaseHTTPMiddleware, dispatch=db_session)
+    return app
+
+
+async def bench(app: FastAPI, n: int) -> float:
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        for _ in range(50):  # warm up
+            await client.get("/ping")
+        start = time.perf_counter()
+        for _ in range(n):
+            await client.get("/ping")
+        return time.perf_counter() - start
+
+
+async def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    print(f"{n} requests")
+    print(f"{'middlewares':<28} {'req/s':>10} {'us/request':>12}")
+    for debug in [False, True]:
+        for asgi in [False, True]:
+            elapsed = await bench(create_app(asgi, debug), n)
+            name = ("pure asgi" if asgi else "BaseHTTPMiddleware") + (" + debug" if debug else "")
+            print(f"{name:<28} {n / elapsed:>10.0f} {elapsed / n * 1e6:>12.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
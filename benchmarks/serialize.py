@@ -0,0 +1,93 @@
+"""
+Measure Job.serialize_with_skills over job lists:
+
+- list page: freshly loaded jobs are serialized once and the page is encoded, with the responsibilities decoded by
+  json.loads (old) and api.utils.fast_json.loads
+- update: the responsibilities are compared and the job is serialized (like update_job), with and without the memo
+
+Usage: python -m benchmarks.serialize
+"""
+
+import json
+import timeit
+from datetime import datetime, timezone
+from importlib.util import find_spec
+from typing import Any, Callable
+from unittest.mock import patch
+
+from api import models
+from api.models.jobs import JobType, ProfessionalLevel, SalaryPer
+from api.services.skills import Skill
+from api.utils import fast_json
+
+
+SKILLS = {f"skill-{i}": Skill(id=f"skill-{i}", parent_id=f"parent-{i // 10}") for i in range(100)}
+RESPONSIBILITIES = json.dumps([f"Lorem ipsum dolor sit amet, consetetur sadipscing elitr {i}" for i in range(8)])
+
+
+def make_jobs(n: int) -> list[models.Job]:
+    company = models.Company(id="00000000-0000-0000-0000-000000000000", name="Company")
+    return [
+        models.Job(
+            id=f"{i:08x}-0000-0000-0000-000000000000",
+            company=company,
+            title=f"Job {i}",
+            description="Lorem ipsum dolor sit amet",
+            location="Remote",
+            remote=True,
+            type=JobType.FULL_TIME,
+            _responsibilities=RESPONSIBILITIES,  # as loaded from the database
+            professional_level=ProfessionalLevel.JUNIOR,
+            salary_min=40000,
+            salary_max=60000,
+            salary_unit="EUR",
+            salary_per=SalaryPer.YEAR,
+            contact="jobs@company.example.com",
+            last_update=datetime.now(timezone.utc),
+            skill_requirements=[models.SkillRequirement(skill_id=f"skill-{(i + j) % 100}", level=j) for j in range(3)],
+        )
+        for i in range(n)
+    ]
+
+
+def render(jobs: list[models.Job]) -> bytes:
+    return fast_json.dumps([job.serialize_with_skills(SKILLS, include_contact=True) for job in jobs])
+
+
+def update(jobs: list[models.Job], memo: bool) -> None:
+    for job in jobs:
+        _ = job.responsibilities != ["foo"]  # the comparison in update_job
+        if not memo:
+            job._responsibilities_cache = None
+        job.serialize_with_skills(SKILLS, include_contact=True)
+
+
+def bench(n: int, func: Callable[[list[models.Job]], Any], loads: Callable[[Any], Any]) -> float:
+    jobs: list[models.Job] = []
+
+    def setup() -> None:
+        # new instances for every run, like rows loaded from the database
+        jobs[:] = make_jobs(n)
+
+    with patch("api.models.jobs.loads", loads):
+        return min(timeit.repeat(lambda: func(jobs), setup, number=1, repeat=20)) / n * 1e6
+
+
+def main() -> None:
+    if not find_spec("orjson"):
+        print("orjson is not installed, fast_json.loads falls back to json.loads")
+
+    print(f"{'jobs':>6} {'case':<40} {'us/job':>8}")
+    for n in [100, 1000]:  # the page sizes of the job list
+        cases: dict[str, tuple[Callable[[list[models.Job]], Any], Callable[[Any], Any]]] = {
+            "list page, json.loads": (render, json.loads),
+            "list page, fast_json.loads": (render, fast_json.loads),
+            "update, json.loads, not memoized": (lambda jobs: update(jobs, False), json.loads),
+            "update, json.loads, memoized": (lambda jobs: update(jobs, True), json.loads),
+        }
+        for name, (func, loads) in cases.items():
+            print(f"{n:>6} {name:<40} {bench(n, func, loads):>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from pytest_mock import MockerFixture
+
+from api import models
+from api.database import db, db_context, select
+from api.endpoints import companies
+from api.exceptions.companies import CompanyNotFoundError
+from api.models.jobs import JobType, ProfessionalLevel, SalaryPer
+
+
+@pytest.fixture(autouse=True)
+def services(mocker: MockerFixture) -> None:
+    mocker.patch("api.utils.cache.get_generation", AsyncMock(return_value="gen"))
+    mocker.patch("api.endpoints.companies.clear_cache", AsyncMock())
+    mocker.patch("api.utils.cache.redis_binary", AsyncMock(mget=AsyncMock(return_value=[None, None])))
+
+
+@pytest.fixture
+async def company_ids() -> list[str]:
+    async with db_context():
+        out = []
+        for i in range(2):
+            company = await models.Company.create(f"Company {i}", None, None, None, None, None, None)
+            await models.Job.create(
+                company_id=company.id,
+                title="title",
+                description="description",
+                location="location",
+                remote=True,
+                type=JobType.FULL_TIME,
+                responsibilities=[],
+                professional_level=ProfessionalLevel.JUNIOR,
+                salary_min=1000,
+                salary_max=2000,
+                salary_unit="EUR",
+                salary_per=SalaryPer.MONTH,
+                contact="contact",
+                skill_requirements={"skill": 1},
+            )
+            out.append(company.id)
+    return out
+
+
+async def test__list_all_companies__statements(company_ids: list[str], statements: list[str]) -> None:
+    async with db_context():
+        await companies.list_all_companies(MagicMock(headers={}))
+
+    assert len(statements) == 1
+
+
+async def test__list_all_companies__not_modified(company_ids: list[str], statements: list[str]) -> None:
+    async with db_context():
+        etag = (await companies.list_all_companies(MagicMock(headers={}))).headers["ETag"]
+        statements.clear()
+        response = await companies.list_all_companies(MagicMock(headers={"If-None-Match": etag}))
+
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    assert response.headers["Vary"] == "Authorization"
+    assert statements == []
+
+
+async def test__delete_company__statements(company_ids: list[str], statements: list[str]) -> None:
+    async with db_context():
+        assert await companies.delete_company(company_ids[0]) is True
+
+    assert [statement.split()[0] for statement in statements] == ["DELETE", "DELETE", "DELETE"]
+    async with db_context():
+        assert await db.all(select(models.Company.id)) == company_ids[1:]
+        assert len(await db.all(select(models.Job))) == 1
+        assert len(await db.all(select(models.SkillRequirement))) == 1
+
+
+async def test__delete_company__not_found(company_ids: list[str]) -> None:
+    async with db_context():
+        with pytest.raises(CompanyNotFoundError):
+            await companies.delete_company("does-not-exist")
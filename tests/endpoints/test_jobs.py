@@ -0,0 +1,633 @@
+import base64
+import json
+import re
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, cast
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from _pytest.monkeypatch import MonkeyPatch
+from fastapi.responses import Response, StreamingResponse
+from pytest_mock import MockerFixture
+from sqlalchemy.sql import Select
+from starlette.datastructures import QueryParams
+
+from api import models
+from api.app import app
+from api.database import db, db_context, filter_by, select
+from api.endpoints import companies, jobs
+from api.exceptions.jobs import InvalidCursorError, JobNotFoundError
+from api.models.jobs import JobType, ProfessionalLevel, SalaryPer
+from api.schemas.companies import UpdateCompany
+from api.schemas.jobs import UpdateJob
+from api.schemas.user import User
+from api.services.skills import Skill
+from api.settings import settings
+from api.utils import cache
+
+
+FILTERS: dict[str, Any] = {
+    "search_term": None,
+    "location": None,
+    "remote": None,
+    "type": None,
+    "professional_level": None,
+    "salary_min": None,
+    "salary_max": None,
+    "salary_unit": None,
+    "salary_per": None,
+    "annual_salary_min": None,
+    "annual_salary_max": None,
+    "requirements_met": None,
+    "limit": 10,
+    "cursor": None,
+    "stream": False,
+}
+
+
+JOB: dict[str, Any] = {
+    "title": "Job",
+    "description": "description",
+    "location": "location",
+    "remote": True,
+    "type": JobType.FULL_TIME,
+    "responsibilities": ["foo", "bar"],
+    "professional_level": ProfessionalLevel.JUNIOR,
+    "salary_min": 1000,
+    "salary_max": 2000,
+    "salary_unit": "EUR",
+    "salary_per": SalaryPer.MONTH,
+    "contact": "contact",
+    "skill_requirements": {"skill0": 1, "skill1": 2},
+}
+
+
+async def create_job(last_update: datetime | None = None, **data: Any) -> str:
+    """Create a job (and a company if there is none yet) and return its id."""
+
+    async with db_context():
+        if not (company := await db.first(select(models.Company))):
+            company = await models.Company.create("Company", None, None, None, None, None, None)
+        job = await models.Job.create(company_id=company.id, **(JOB | data))
+        if last_update:
+            job.last_update = last_update
+        return job.id
+
+
+async def list_jobs(headers: dict[str, str] | None = None, user: User | None = None, **filters: Any) -> Response:
+    params = QueryParams(
+        [
+            (key, str(value))
+            for key, values in filters.items()
+            for value in (values if isinstance(values, list) else [values])
+            if value is not None
+        ]
+    )
+    async with db_context():
+        return cast(
+            Response,
+            await jobs.list_all_jobs(
+                MagicMock(headers=headers or {}, query_params=params), **(FILTERS | filters), user=user
+            ),
+        )
+
+
+async def get_list_query(mocker: MockerFixture, **filters: Any) -> Select:
+    mocker.patch("api.utils.cache.get_generation", AsyncMock(return_value="gen"))
+    render_jobs = mocker.patch("api.endpoints.jobs._render_jobs_cached", AsyncMock(return_value=(b"[]", None)))
+
+    await jobs.list_all_jobs(MagicMock(headers={}, query_params=MagicMock()), **(FILTERS | filters), user=None)
+
+    return cast(Select, render_jobs.call_args.args[2])
+
+
+async def explain(query: Select) -> str:
+    statement = query.compile(dialect=db.engine.dialect, compile_kwargs={"literal_binds": True})
+    async with db.engine.connect() as conn:
+        rows = await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}")
+        return "\n".join(row[3] for row in rows)
+
+
+@pytest.mark.parametrize(
+    "filters,index",
+    [
+        ({}, "ix_jobs_jobs_last_update_id"),
+        ({"remote": True}, "ix_jobs_jobs_remote_last_update_id"),
+        ({"type": [JobType.FULL_TIME]}, "ix_jobs_jobs_type_last_update_id"),
+        ({"type": [JobType.FULL_TIME, JobType.INTERNSHIP]}, "ix_jobs_jobs_type_last_update_id"),
+        ({"professional_level": [ProfessionalLevel.JUNIOR]}, "ix_jobs_jobs_professional_level_last_update_id"),
+        ({"salary_per": SalaryPer.YEAR}, "ix_jobs_jobs_salary_per_last_update_id"),
+        ({"salary_min": 1000}, "ix_jobs_jobs_salary_max"),
+        ({"salary_max": 1000}, "ix_jobs_jobs_salary_min"),
+        ({"salary_min": 1000, "salary_max": 2000}, "ix_jobs_jobs_salary_min|ix_jobs_jobs_salary_max"),
+        ({"annual_salary_min": 50000}, "ix_jobs_jobs_annual_salary_max"),
+        ({"annual_salary_max": 50000}, "ix_jobs_jobs_annual_salary_min"),
+        (
+            {"annual_salary_min": 50000, "annual_salary_max": 80000},
+            "ix_jobs_jobs_annual_salary_min|ix_jobs_jobs_annual_salary_max",
+        ),
+        (
+            {"remote": False, "type": [JobType.PART_TIME]},
+            "ix_jobs_jobs_remote_last_update_id|ix_jobs_jobs_type_last_update_id",
+        ),
+        (
+            {"remote": True, "salary_per": SalaryPer.MONTH, "salary_min": 1000},
+            "ix_jobs_jobs_remote_last_update_id|ix_jobs_jobs_salary_per_last_update_id|ix_jobs_jobs_salary_max",
+        ),
+    ],
+)
+async def test__list_all_jobs__query_plan(filters: dict[str, Any], index: str, mocker: MockerFixture) -> None:
+    plan = await explain(await get_list_query(mocker, **filters))
+
+    assert re.search(rf"USING INDEX ({index})\b", plan)
+    assert "SCAN jobs_jobs\n" not in plan + "\n"
+
+
+async def test__requirements_met__query_plan(mocker: MockerFixture) -> None:
+    mocker.patch("api.endpoints.jobs.get_skill_levels", AsyncMock(return_value={"skill": 3}))
+
+    plan = await explain(await get_list_query(mocker, requirements_met=True))
+
+    # the correlated subquery looks up the skill requirements of each job by primary key
+    assert "USING PRIMARY KEY" in plan or "USING INDEX sqlite_autoindex_jobs_skill_requirements_1" in plan
+
+
+@pytest.fixture
+def services(mocker: MockerFixture) -> None:
+    skills = {f"skill{i}": Skill(id=f"skill{i}", parent_id="parent") for i in range(3)}
+    mocker.patch("api.endpoints.jobs.get_skills", AsyncMock(return_value=skills))
+    mocker.patch("api.models.jobs.get_skills", AsyncMock(return_value=skills))
+    mocker.patch("api.utils.cache.get_generation", AsyncMock(return_value="gen"))
+    mocker.patch("api.endpoints.jobs.clear_cache", AsyncMock())
+    mocker.patch("api.utils.cache.redis_binary", AsyncMock(mget=AsyncMock(return_value=[None, None])))
+
+
+@pytest.fixture
+async def job_ids() -> list[str]:
+    return [await create_job(title=f"Job {i}") for i in range(3)]
+
+
+@pytest.mark.parametrize("ranked", [False, True])
+async def test__cursor(ranked: bool) -> None:
+    job = MagicMock(search_rank=1.5, last_update=datetime(2026, 10, 17, 12, 34, 56, tzinfo=timezone.utc), id="job")
+
+    cursor = jobs._encode_cursor(job, ranked)
+
+    assert jobs._decode_cursor(cursor, ranked) == [*([1.5] if ranked else []), job.last_update, "job"]
+    assert jobs._decode_cursor(cursor, not ranked) is None
+
+
+async def test__list_all_jobs__pages(services: None) -> None:
+    now = datetime(2026, 10, 17, tzinfo=timezone.utc)
+    # several jobs with the same last_update, so pages have to be split by id
+    last_updates = [
+        now,
+        now - timedelta(hours=1),
+        now - timedelta(hours=1),
+        now - timedelta(hours=1),
+        now - timedelta(hours=2),
+    ]
+    expected = [
+        job_id
+        for _, job_id in sorted(
+            [(last_update, await create_job(last_update)) for last_update in last_updates], reverse=True
+        )
+    ]
+
+    out = []
+    cursor = None
+    for i in range(3):
+        response = await list_jobs(limit=2, cursor=cursor)
+        out.append([job["id"] for job in json.loads(response.body)])
+        cursor = response.headers.get("X-Next-Cursor")
+        assert bool(cursor) == (i < 2)
+        assert response.headers.get("Access-Control-Expose-Headers") == ("X-Next-Cursor" if cursor else None)
+
+    assert out == [expected[:2], expected[2:4], expected[4:]]
+
+
+def b64(data: str) -> str:
+    return base64.urlsafe_b64encode(data.encode()).decode()
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    ["!!!", b64("not json"), b64("[]"), b64('["yesterday", "job"]'), b64('[1.5, "2026-10-17T00:00:00+00:00", "job"]')],
+)
+async def test__list_all_jobs__invalid_cursor(cursor: str, services: None) -> None:
+    with pytest.raises(InvalidCursorError):
+        await list_jobs(limit=2, cursor=cursor)
+
+
+@pytest.mark.parametrize("requirements_met", [None, True, False])
+async def test__list_all_jobs__requirements_met(
+    requirements_met: bool | None, services: None, mocker: MockerFixture
+) -> None:
+    mocker.patch("api.endpoints.jobs.get_skill_levels", AsyncMock(return_value={"skill0": 1, "skill1": 3}))
+    user = User(id="user", email_verified=True, admin=False)
+    met = {
+        await create_job(title="met", skill_requirements={"skill0": 1, "skill1": 2}),
+        await create_job(title="no requirements", skill_requirements={}),
+    }
+    not_met = {
+        await create_job(title="level too low", skill_requirements={"skill0": 1, "skill1": 4}),
+        await create_job(title="skill missing", skill_requirements={"skill2": 1}),
+    }
+
+    out = json.loads((await list_jobs(user=user, requirements_met=requirements_met)).body)
+
+    expected = {None: met | not_met, True: met, False: not_met}[requirements_met]
+    assert {job["id"] for job in out} == expected
+    assert {job["id"] for job in out if job["contact"]} == expected & met
+
+
+async def stream_jobs(**filters: Any) -> tuple[StreamingResponse, list[dict[str, Any]]]:
+    """List jobs as newline delimited json and return the response and the decoded lines."""
+
+    async with db_context():
+        response = await list_jobs(headers={"Accept": "application/x-ndjson"}, **filters)
+        assert isinstance(response, StreamingResponse)
+        body = b"".join([cast(bytes, chunk) async for chunk in response.body_iterator])
+
+    assert body.endswith(b"\n")
+    return response, [json.loads(line) for line in body.splitlines()]
+
+
+@pytest.mark.parametrize("limit", [None, 2])
+async def test__list_all_jobs__stream(
+    limit: int | None, services: None, job_ids: list[str], statements: list[str]
+) -> None:
+    response, out = await stream_jobs(limit=limit)
+
+    assert response.media_type == "application/x-ndjson"
+    assert [job["id"] for job in out] == job_ids[::-1][:limit]
+    assert all(job["contact"] is None for job in out)
+    assert "X-Next-Cursor" not in response.headers
+    assert len(statements) == 2  # jobs joined with companies, skill requirements
+
+    # the streamed and the regular representation have different entity tags
+    regular = await list_jobs(limit=limit)
+    assert json.loads(regular.body) == out
+    assert response.headers["ETag"] != regular.headers["ETag"]
+    assert response.headers["ETag"] == (await stream_jobs(limit=limit))[0].headers["ETag"]
+    not_modified = await list_jobs(
+        headers={"Accept": "application/x-ndjson", "If-None-Match": response.headers["ETag"]}, limit=limit
+    )
+    assert not_modified.status_code == 304
+
+
+@pytest.fixture
+async def search_job_ids() -> dict[str, str]:
+    return {
+        "python": await create_job(
+            title="Python Developer", description="Web applications", responsibilities=["Kubernetes"]
+        ),
+        "java": await create_job(title="Java Developer", description="Backend services", responsibilities=["Testing"]),
+    }
+
+
+@pytest.mark.parametrize(
+    "search_term,expected",
+    [
+        ("develop", {"python", "java"}),
+        ("DEVELOPER", {"python", "java"}),
+        ("python dev", {"python"}),
+        ("dev, python!", {"python"}),
+        ("python backend", set()),
+        ("backend", {"java"}),
+        ("kubern", {"python"}),
+        ("eloper", set()),
+        ("rust", set()),
+        ("ja", {"java"}),  # too short for the full-text index
+    ],
+)
+async def test__list_all_jobs__search(
+    search_term: str, expected: set[str], services: None, search_job_ids: dict[str, str]
+) -> None:
+    out = json.loads((await list_jobs(search_term=search_term)).body)
+
+    assert {job["id"] for job in out} == {search_job_ids[name] for name in expected}
+
+
+@pytest.mark.parametrize(
+    "search_term,expected", [("eloper", {"python", "java"}), ("python dev", {"python"}), ("dev python", set())]
+)
+async def test__list_all_jobs__search__substring(
+    search_term: str, expected: set[str], services: None, search_job_ids: dict[str, str], monkeypatch: MonkeyPatch
+) -> None:
+    monkeypatch.setattr(settings, "fulltext_search", False)
+
+    out = json.loads((await list_jobs(search_term=search_term)).body)
+
+    assert {job["id"] for job in out} == {search_job_ids[name] for name in expected}
+
+
+async def test__list_all_jobs__search__updated(services: None, search_job_ids: dict[str, str]) -> None:
+    async with db_context():
+        job = await db.get(models.Job, id=search_job_ids["java"])
+        assert job
+        job.title = "Rust Developer"
+
+    assert [job["id"] for job in json.loads((await list_jobs(search_term="rust")).body)] == [search_job_ids["java"]]
+    assert json.loads((await list_jobs(search_term="java")).body) == []
+
+
+async def test__list_all_jobs__search__pages(services: None) -> None:
+    # jobs which mention the search term more often are more relevant, equally relevant jobs are ordered as usual
+    now = datetime(2026, 10, 17, tzinfo=timezone.utc)
+    ids = [
+        await create_job(now - timedelta(hours=i), title="Python " * n + "Developer", description="description")
+        for i, n in enumerate([1, 3, 2, 2, 2, 4])
+    ]
+    unrelated = await create_job(title="Java Developer")
+
+    expected = [ids[5], ids[1], ids[2], ids[3], ids[4], ids[0]]
+    assert [job["id"] for job in json.loads((await list_jobs(search_term="python", limit=None)).body)] == expected
+
+    out = []
+    cursor = None
+    while True:
+        response = await list_jobs(search_term="python", limit=2, cursor=cursor)
+        out += [job["id"] for job in json.loads(response.body)]
+        if not (cursor := response.headers.get("X-Next-Cursor")):
+            break
+    assert out == expected
+    assert unrelated not in out
+
+    with pytest.raises(InvalidCursorError):  # cursors of ranked and unranked lists are not interchangeable
+        await list_jobs(
+            limit=2, cursor=base64.urlsafe_b64encode(f'[1.0, "{now.isoformat()}", "{ids[0]}"]'.encode()).decode()
+        )
+
+
+async def test__list_all_jobs__statements(services: None, job_ids: list[str], statements: list[str]) -> None:
+    async with db_context():
+        response = await jobs.list_all_jobs(MagicMock(headers={}, query_params=MagicMock()), **FILTERS, user=None)
+
+    assert len(json.loads(response.body)) == 3
+    assert len(statements) == 2  # jobs joined with companies, skill requirements
+    assert "JOIN jobs_companies" in statements[0]
+    assert "FROM jobs_skill_requirements" in statements[1]
+
+
+async def test__list_all_jobs__skills_loaded_once(services: None, job_ids: list[str], mocker: MockerFixture) -> None:
+    skills = {f"skill{i}": Skill(id=f"skill{i}", parent_id="parent") for i in range(3)}
+    get_skills = mocker.patch("api.endpoints.jobs.get_skills", AsyncMock(return_value=skills))
+    get_job_skills = mocker.patch("api.models.jobs.get_skills", AsyncMock(return_value=skills))
+    serialize = mocker.spy(models.Job, "serialize")
+
+    response = await list_jobs()
+
+    assert len(json.loads(response.body)) == 3
+    get_skills.assert_awaited_once_with()
+    get_job_skills.assert_not_called()
+    serialize.assert_not_called()
+
+
+@pytest.fixture
+def redis_store(services: None, mocker: MockerFixture) -> dict[str, bytes]:
+    """Keep the cache in a dict and use the real cache generations."""
+
+    store: dict[str, bytes] = {}
+
+    def set_(key: str, value: str, nx: bool = False) -> None:
+        if not (nx and key in store):
+            store[key] = value.encode()
+
+    redis = mocker.patch("api.utils.cache.redis_binary", AsyncMock())
+    redis.mget.side_effect = lambda *keys: [store.get(key) for key in keys]
+    redis.get.side_effect = store.get
+    redis.set.side_effect = set_
+    redis.setex.side_effect = lambda key, _, value: store.__setitem__(key, value)
+    mocker.stop(cast(AsyncMock, cache.get_generation))
+    mocker.patch("api.endpoints.jobs.clear_cache", cache.clear_cache)
+    mocker.patch("api.endpoints.companies.clear_cache", cache.clear_cache)
+    return store
+
+
+async def test__list_all_jobs__cache(
+    redis_store: dict[str, bytes], job_ids: list[str], statements: list[str], mocker: MockerFixture
+) -> None:
+    mocker.patch("api.endpoints.jobs.get_skill_levels", AsyncMock(return_value={"skill0": 1}))
+    user = User(id="user", email_verified=True, admin=False)
+    first = await list_jobs(limit=2)
+    statements.clear()
+
+    second = await list_jobs(limit=2)
+    assert statements == []
+    assert second.body == first.body
+    assert second.headers["ETag"] == first.headers["ETag"]
+    assert second.headers["X-Next-Cursor"] == first.headers["X-Next-Cursor"]
+
+    # other query parameters and users with different skill levels are cached separately
+    for limit, other_user in [(3, None), (2, user)]:
+        response = await list_jobs(limit=limit, user=other_user)
+        assert len(statements) == 2
+        assert response.headers["ETag"] != first.headers["ETag"]
+        statements.clear()
+    await list_jobs(limit=2, user=user)
+    assert statements == []
+
+
+@pytest.mark.parametrize("limit,cached", [(None, True), (100, True), (101, False)])
+async def test__list_all_jobs__cache__limit(
+    limit: int | None, cached: bool, redis_store: dict[str, bytes], job_ids: list[str], statements: list[str]
+) -> None:
+    await list_jobs(limit=limit)
+    statements.clear()
+
+    assert len(json.loads((await list_jobs(limit=limit)).body)) == 3
+    assert len(statements) == (0 if cached else 2)
+    assert bool([key for key in redis_store if key.startswith("func_cache:jobs:")]) is cached
+
+
+async def test__list_all_jobs__cache__normalized(
+    redis_store: dict[str, bytes], job_ids: list[str], statements: list[str]
+) -> None:
+    first = await list_jobs(type=[JobType.FULL_TIME, JobType.PART_TIME], remote=True)
+    statements.clear()
+
+    # the key is built from the parsed parameters, not from their spelling (or unknown parameters) in the url
+    async with db_context():
+        second = await jobs.list_all_jobs(
+            MagicMock(headers={}, query_params=QueryParams("remote=1&type=PART_TIME&type=FULL_TIME&_=1234")),
+            **(
+                FILTERS
+                | {
+                    "type": [JobType.PART_TIME, JobType.FULL_TIME, JobType.PART_TIME],
+                    "remote": True,
+                    "search_term": "",
+                    "salary_min": 0,
+                }
+            ),
+            user=None,
+        )
+
+    assert statements == []
+    assert second.body == first.body
+    assert second.headers["ETag"] == first.headers["ETag"]
+
+
+async def test__list_all_jobs__cache__job_changed(
+    redis_store: dict[str, bytes], job_ids: list[str], statements: list[str]
+) -> None:
+    etag = (await list_jobs()).headers["ETag"]
+
+    async with db_context():
+        await jobs.update_job(job_ids[0], UpdateJob.parse_obj({"title": "new title"}))
+    statements.clear()
+
+    response = await list_jobs()
+    assert len(statements) == 2
+    assert response.headers["ETag"] != etag
+    assert "new title" in [job["title"] for job in json.loads(response.body)]
+
+    async with db_context():
+        await jobs.delete_job(job_ids[0])
+    assert job_ids[0] not in [job["id"] for job in json.loads((await list_jobs()).body)]
+
+
+async def test__list_all_jobs__cache__company_changed(redis_store: dict[str, bytes], job_ids: list[str]) -> None:
+    async with db_context():
+        company_id = cast(str, await db.first(select(models.Company.id)))
+    etag = (await list_jobs()).headers["ETag"]
+
+    async with db_context():
+        await companies.update_company(company_id, UpdateCompany.parse_obj({"name": "new name"}))
+
+    response = await list_jobs()
+    assert response.headers["ETag"] != etag
+    assert {job["company"]["name"] for job in json.loads(response.body)} == {"new name"}
+
+    async with db_context():
+        await companies.delete_company(company_id)
+    assert json.loads((await list_jobs()).body) == []
+
+
+@pytest.mark.parametrize("age,primary", [(1, True), (10, False)])
+async def test__replica_lag(
+    age: float, primary: bool, services: None, job_ids: list[str], mocker: MockerFixture, monkeypatch: MonkeyPatch
+) -> None:
+    monkeypatch.setattr(settings, "database_replica_max_lag", 5)
+    mocker.patch("api.utils.cache.get_generation", AsyncMock(return_value=f"gen:{time.time() - age}"))
+    use_primary = mocker.patch.object(db, "use_primary")
+
+    await list_jobs()
+    async with db_context():
+        await jobs.get_job(job_ids[0], MagicMock(headers={}), user=None)
+
+    assert use_primary.call_count == 2 * primary
+
+
+async def test__get_job__statements(services: None, job_ids: list[str], statements: list[str]) -> None:
+    async with db_context():
+        response = await jobs.get_job(job_ids[0], MagicMock(headers={}), user=None)
+
+    assert sorted(json.loads(response.body)["skill_requirements"]) == [["parent", "skill0", 1], ["parent", "skill1", 2]]
+    assert len(statements) == 2  # job joined with company, skill requirements
+    assert "JOIN jobs_companies" in statements[0]
+    assert response.headers["Vary"] == "Authorization"
+
+
+@pytest.mark.parametrize(
+    "levels,admin,contact", [({}, False, False), ({"skill0": 1, "skill1": 2}, False, True), ({}, True, True)]
+)
+async def test__get_job__etag(
+    levels: dict[str, int], admin: bool, contact: bool, services: None, job_ids: list[str], mocker: MockerFixture
+) -> None:
+    mocker.patch("api.endpoints.jobs.get_skill_levels", AsyncMock(return_value=levels))
+    user = User(id="user", email_verified=True, admin=admin)
+    async with db_context():
+        response = await jobs.get_job(job_ids[0], MagicMock(headers={}), user=user)
+        anonymous = await jobs.get_job(job_ids[0], MagicMock(headers={}), user=None)
+        not_modified = await jobs.get_job(
+            job_ids[0], MagicMock(headers={"If-None-Match": response.headers["ETag"]}), user=user
+        )
+
+    assert (json.loads(response.body)["contact"] is not None) is contact
+    assert (response.headers["ETag"] == anonymous.headers["ETag"]) is not contact
+    assert not_modified.status_code == 304
+    assert not_modified.headers["ETag"] == response.headers["ETag"]
+    assert not_modified.headers["Vary"] == "Authorization"
+
+
+async def test__get_job__etag_changed(services: None, job_ids: list[str]) -> None:
+    async with db_context():
+        etag = (await jobs.get_job(job_ids[0], MagicMock(headers={}), user=None)).headers["ETag"]
+        await jobs.update_job(job_ids[0], UpdateJob.parse_obj({"title": "new title"}))
+
+    async with db_context():
+        response = await jobs.get_job(job_ids[0], MagicMock(headers={"If-None-Match": etag}), user=None)
+
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+async def test__list_all_jobs__not_modified(services: None, job_ids: list[str], statements: list[str]) -> None:
+    etag = (await list_jobs()).headers["ETag"]
+    statements.clear()
+
+    response = await list_jobs(headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    assert response.headers["Vary"] == "Authorization"
+    assert statements == []
+
+
+@pytest.mark.parametrize("path", ["/jobs", "/jobs/{job_id}", "/companies"])
+async def test__openapi__not_modified(path: str) -> None:
+    assert "304" in app.openapi()["paths"][path]["get"]["responses"]
+
+
+async def test__update_job__statements(services: None, job_ids: list[str], statements: list[str]) -> None:
+    async with db_context():
+        response = await jobs.update_job(job_ids[0], UpdateJob.parse_obj({"title": "new title"}))
+
+    assert json.loads(response.body)["title"] == "new title"
+    assert [statement.split()[0] for statement in statements] == ["SELECT", "SELECT", "UPDATE"]
+
+
+@pytest.mark.parametrize("responsibilities", [["foo", "bar"], ["foo", "baz"]])
+async def test__update_job__responsibilities_parsed_once(
+    services: None, job_ids: list[str], mocker: MockerFixture, responsibilities: list[str]
+) -> None:
+    loads = mocker.patch("api.models.jobs.loads", side_effect=json.loads)
+
+    async with db_context():
+        response = await jobs.update_job(job_ids[0], UpdateJob.parse_obj({"responsibilities": responsibilities}))
+
+    assert json.loads(response.body)["responsibilities"] == responsibilities
+    loads.assert_called_once()
+
+
+async def test__delete_job__statements(services: None, job_ids: list[str], statements: list[str]) -> None:
+    async with db_context():
+        assert await jobs.delete_job(job_ids[0]) is True
+
+    assert [statement.split()[0] for statement in statements] == ["DELETE", "DELETE"]
+    async with db_context():
+        assert await db.all(select(models.Job.id)) == job_ids[1:]
+        assert await db.count(filter_by(models.SkillRequirement, job_id=job_ids[0])) == 0
+
+
+async def test__delete_job__not_found(services: None, job_ids: list[str]) -> None:
+    async with db_context():
+        with pytest.raises(JobNotFoundError):
+            await jobs.delete_job("does-not-exist")
+
+
+async def test__update_job__relationships(services: None, job_ids: list[str]) -> None:
+    async with db_context():
+        company_id = (await models.Company.create("Other Company", None, None, None, None, None, None)).id
+
+    async with db_context():
+        data = UpdateJob.parse_obj({"company_id": company_id, "skill_requirements": {"skill2": 3}})
+        response = await jobs.update_job(job_ids[0], data)
+
+    out = json.loads(response.body)
+    assert out["company"]["name"] == "Other Company"
+    assert out["skill_requirements"] == [["parent", "skill2", 3]]
+    async with db_context():
+        assert await db.all(select(models.SkillRequirement.skill_id).filter_by(job_id=job_ids[0])) == ["skill2"]
@@ -1,10 +1,11 @@
-from typing import AsyncIterator
+from typing import Any, AsyncIterator, Iterator
 from unittest.mock import AsyncMock
 
 import pytest
 from _pytest.monkeypatch import MonkeyPatch
 from httpx import AsyncClient
 from pytest_mock import MockerFixture
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import create_async_engine
 
 from api.app import app
@@ -13,10 +14,25 @@ from api.database import db
 
 @pytest.fixture(autouse=True)
 async def database(monkeypatch: MonkeyPatch) -> None:
-    monkeypatch.setattr(db, "engine", create_async_engine("sqlite+aiosqlite:///:memory:"))
+    monkeypatch.setattr(db, "engine", engine := create_async_engine("sqlite+aiosqlite:///:memory:"))
+    db.instrument(engine)
     await db.create_tables()
 
 
+@pytest.fixture
+def statements(database: None) -> Iterator[list[str]]:
+    """Record all sql statements which are sent to the database."""
+
+    out: list[str] = []
+
+    def before_cursor_execute(_conn: Any, _cursor: Any, statement: str, *_args: Any) -> None:
+        out.append(statement)
+
+    event.listen(db.engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    yield out
+    event.remove(db.engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+
+
 @pytest.fixture
 async def client() -> AsyncIterator[AsyncClient]:
     async with AsyncClient(app=app, base_url="http://test") as client:
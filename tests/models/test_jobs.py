@@ -0,0 +1,129 @@
+import json
+
+import pytest
+from _pytest.monkeypatch import MonkeyPatch
+from pytest_mock import MockerFixture
+from sqlalchemy.dialects.mysql.base import MySQLDialect
+from sqlalchemy.dialects.postgresql.base import PGDialect
+from sqlalchemy.dialects.sqlite.base import SQLiteDialect
+from sqlalchemy.engine import Dialect
+
+from api import models
+from api.models.jobs import SalaryPer, annual_salary_factor
+from api.settings import settings
+
+
+@pytest.fixture(autouse=True)
+def conversion_table(monkeypatch: MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "salary_base_currency", "EUR")
+    monkeypatch.setattr(settings, "salary_exchange_rates", {"usd": 0.5, "Gbp": 1.25, "JPY": 0.0061})
+    monkeypatch.setattr(settings, "salary_periods_per_year", {"hour": 2000, "month": 12, "year": 1})
+
+
+@pytest.mark.parametrize(
+    "unit,per,expected",
+    [
+        ("EUR", SalaryPer.YEAR, 1),
+        (" eur ", SalaryPer.MONTH, 12),
+        ("USD", SalaryPer.HOUR, 1000),
+        ("gbp", SalaryPer.MONTH, 15),
+        ("CHF", SalaryPer.YEAR, None),
+        ("EUR", SalaryPer.DAY, None),
+        ("EUR", SalaryPer.ONCE, None),
+        ("EUR", SalaryPer.TASK, None),
+    ],
+)
+async def test__annual_salary_factor(unit: str, per: SalaryPer, expected: float | None) -> None:
+    assert annual_salary_factor(unit, per) == expected
+
+
+@pytest.mark.parametrize(
+    "unit,per,expected",
+    [
+        ("USD", SalaryPer.MONTH, (6006, 12018)),
+        ("EUR", SalaryPer.YEAR, (1001, 2003)),
+        ("JPY", SalaryPer.YEAR, (6, 12)),
+        ("CHF", SalaryPer.YEAR, None),
+    ],
+)
+async def test__update_annual_salary(unit: str, per: SalaryPer, expected: tuple[int, int] | None) -> None:
+    job = models.Job(salary_min=1001, salary_max=2003, salary_unit=unit, salary_per=per)
+    job.annual_salary_min = job.annual_salary_max = 42
+
+    job.update_annual_salary()
+
+    assert (job.annual_salary_min, job.annual_salary_max) == (expected or (None, None))
+
+
+async def test__responsibilities__empty() -> None:
+    assert models.Job().responsibilities == []
+    assert models.Job(_responsibilities="").responsibilities == []
+
+
+async def test__responsibilities__memoized(mocker: MockerFixture) -> None:
+    loads = mocker.patch("api.models.jobs.loads", side_effect=json.loads)
+    job = models.Job(_responsibilities='["foo", "bär"]')
+
+    assert job.responsibilities == ["foo", "bär"]
+    assert job.responsibilities == ["foo", "bär"]
+    loads.assert_called_once_with('["foo", "bär"]')
+
+    job.responsibilities.append("baz")  # returned lists are copies
+    assert job.responsibilities == ["foo", "bär"]
+
+    job._responsibilities = '["baz"]'  # e.g. after the row has been reloaded
+    assert job.responsibilities == ["baz"]
+    assert loads.call_count == 2
+
+
+async def test__responsibilities__setter(mocker: MockerFixture) -> None:
+    loads = mocker.patch("api.models.jobs.loads")
+    job = models.Job(_responsibilities='["old"]')
+
+    job.responsibilities = ["foo", "bar"]
+
+    assert job._responsibilities == '["foo", "bar"]'
+    assert job.responsibilities == ["foo", "bar"]
+    loads.assert_not_called()
+
+
+@pytest.mark.parametrize(
+    "dialect,expected",
+    [
+        (
+            MySQLDialect(),
+            "MATCH (jobs_jobs.title, jobs_jobs.description, jobs_jobs._responsibilities) AGAINST"
+            " ('+Python* +dev*' IN BOOLEAN MODE)",
+        ),
+        (PGDialect(), "@@ to_tsquery('simple', 'Python:* & dev:*')"),
+        (SQLiteDialect(), """jobs_jobs_fts MATCH '"Python"* "dev"*'"""),
+    ],
+)
+def test__fulltext_search(dialect: Dialect, expected: str) -> None:
+    search = models.Job.fulltext_search(dialect.name, "Python, dev!")
+
+    assert search
+    assert expected in str(search[0].compile(dialect=dialect, compile_kwargs={"literal_binds": True}))
+
+
+@pytest.mark.parametrize(
+    "term,against",
+    [
+        ("Head of Sales", "+Head* +Sales*"),
+        ("IT manager", "+manager*"),
+        ("C# developer", "+developer*"),
+        ("The Art of Go", "+Art*"),
+    ],
+)
+def test__fulltext_search__mysql_unindexed_words(term: str, against: str) -> None:
+    search = models.Job.fulltext_search("mysql", term)
+
+    assert search
+    assert f"AGAINST ('{against}' IN BOOLEAN MODE)" in str(
+        search[0].compile(dialect=MySQLDialect(), compile_kwargs={"literal_binds": True})
+    )
+
+
+@pytest.mark.parametrize("dialect,term", [("sqlite", "!?"), ("mssql", "python"), ("mysql", "IT in the UK")])
+def test__fulltext_search__unsupported(dialect: str, term: str) -> None:
+    assert models.Job.fulltext_search(dialect, term) is None
@@ -5,13 +5,17 @@ import pytest
 from _pytest.monkeypatch import MonkeyPatch
 from pytest_mock import MockerFixture
 
+from api.services import internal
 from api.services.internal import InternalService, InternalServiceError
 from api.settings import settings
 
 
 async def test__internal_service__get_token(mocker: MockerFixture, monkeypatch: MonkeyPatch) -> None:
     encode_jwt = mocker.patch("api.services.internal.encode_jwt")
+    mocker.patch("time.monotonic", return_value=1000)
     monkeypatch.setattr(settings, "internal_jwt_ttl", 123)
+    monkeypatch.setattr(settings, "internal_jwt_refresh_margin", 20)
+    monkeypatch.setattr(internal, "_tokens", {})
     service = MagicMock()
     service.name = "MY_SERVICE"
 
@@ -19,6 +23,28 @@ async def test__internal_service__get_token(mocker: MockerFixture, monkeypatch:
 
     encode_jwt.assert_called_once_with({"aud": "my_service"}, timedelta(seconds=123))
     assert result == encode_jwt()
+    assert internal._tokens == {service: (1123, result)}
+
+
+async def test__internal_service__get_token__cached(mocker: MockerFixture, monkeypatch: MonkeyPatch) -> None:
+    encode_jwt = mocker.patch("api.services.internal.encode_jwt", side_effect=["token1", "token2", "token3"])
+    monotonic = mocker.patch("time.monotonic")
+    monkeypatch.setattr(settings, "internal_jwt_ttl", 123)
+    monkeypatch.setattr(settings, "internal_jwt_refresh_margin", 20)
+    monkeypatch.setattr(internal, "_tokens", {})
+    service, other = MagicMock(), MagicMock()
+
+    results = []
+    for now in [1000, 1050, 1102.5]:
+        monotonic.return_value = now
+        results.append(InternalService._get_token(service))
+    assert results == ["token1", "token1", "token1"]
+
+    monotonic.return_value = 1103
+    assert InternalService._get_token(service) == "token2"
+    assert InternalService._get_token(other) == "token3"
+    assert InternalService._get_token(service) == "token2"
+    assert encode_jwt.call_count == 3
 
 
 @pytest.mark.parametrize(
@@ -38,19 +64,73 @@ async def test__internal_service__handle_error(code: int, ok: bool) -> None:
         assert e.value.args == (response, "response text asdf")
 
 
-async def test__internal_service__client(mocker: MockerFixture, monkeypatch: MonkeyPatch) -> None:
+async def test__internal_service__add_token() -> None:
+    service = MagicMock()
+    request = MagicMock(headers={})
+
+    await InternalService._add_token(service, request)
+
+    assert request.headers == {"Authorization": service._get_token()}
+
+
+async def test__internal_service__create_client(mocker: MockerFixture, monkeypatch: MonkeyPatch) -> None:
     async_client = mocker.patch("api.services.internal.AsyncClient")
+    limits = mocker.patch("api.services.internal.Limits")
+    timeout = mocker.patch("api.services.internal.Timeout")
+    monkeypatch.setattr(settings, "internal_max_connections", 12)
+    monkeypatch.setattr(settings, "internal_max_keepalive_connections", 34)
+    monkeypatch.setattr(settings, "internal_keepalive_expiry", 56)
+    monkeypatch.setattr(settings, "internal_timeout", 78)
     service = MagicMock(value="http://example.service:1234/test/")
 
-    result = InternalService.client.fget(service)  # type: ignore
+    result = InternalService._create_client(service)
 
+    limits.assert_called_once_with(max_connections=12, max_keepalive_connections=34, keepalive_expiry=56)
+    timeout.assert_called_once_with(78)
     async_client.assert_called_once()
     args = async_client.call_args[1]
     assert result == async_client()
 
     assert args["base_url"] == "http://example.service:1234/test/_internal"
-    assert args["headers"] == {"Authorization": service._get_token()}
+    assert args["limits"] == limits()
+    assert args["timeout"] == timeout()
+    assert "headers" not in args
 
     event_hooks = args["event_hooks"]
-    assert [*event_hooks] == ["response"]
+    assert [*event_hooks] == ["request", "response"]
+    assert event_hooks["request"] == [service._add_token]
     assert event_hooks["response"] == [service._handle_error]
+
+
+async def test__internal_service__client(monkeypatch: MonkeyPatch) -> None:
+    monkeypatch.setattr(internal, "_clients", {})
+    service = MagicMock()
+    client = service._create_client.return_value = MagicMock(is_closed=False)
+
+    result = InternalService.client.fget(service)  # type: ignore
+
+    assert result is client
+    assert InternalService.client.fget(service) is client  # type: ignore
+    service._create_client.assert_called_once_with()
+
+
+async def test__internal_service__client__closed(monkeypatch: MonkeyPatch) -> None:
+    service = MagicMock()
+    monkeypatch.setattr(internal, "_clients", {service: MagicMock(is_closed=True)})
+
+    result = InternalService.client.fget(service)  # type: ignore
+
+    service._create_client.assert_called_once_with()
+    assert result == service._create_client()
+    assert internal._clients == {service: result}
+
+
+async def test__internal_service__close_clients(monkeypatch: MonkeyPatch) -> None:
+    clients = [AsyncMock(), AsyncMock()]
+    monkeypatch.setattr(internal, "_clients", {MagicMock(): client for client in clients})
+
+    await InternalService.close_clients()
+
+    for client in clients:
+        client.aclose.assert_called_once_with()
+    assert internal._clients == {}
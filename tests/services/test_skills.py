@@ -0,0 +1,46 @@
+import asyncio
+from typing import Any
+from unittest.mock import AsyncMock, MagicMock
+
+from _pytest.monkeypatch import MonkeyPatch
+from pytest_mock import MockerFixture
+
+from api.services import skills
+from api.settings import settings
+
+
+async def test__fetch_skill_levels(mocker: MockerFixture, monkeypatch: MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "skill_levels_batch_concurrency", 2)
+    active = max_active = 0
+
+    async def get(path: str) -> Any:
+        nonlocal active, max_active
+        active += 1
+        max_active = max(active, max_active)
+        await asyncio.sleep(0.01)
+        active -= 1
+        return MagicMock(json=MagicMock(return_value={"skill": len(path)}))
+
+    internal_service_patch = mocker.patch("api.services.skills.InternalService")
+    internal_service_patch.SKILLS.client.get = AsyncMock(side_effect=get)
+
+    result = await skills._fetch_skill_levels(["a", "bb", "ccc", "dddd", "eeeee"])
+
+    assert result == {
+        "a": {"skill": 9},
+        "bb": {"skill": 10},
+        "ccc": {"skill": 11},
+        "dddd": {"skill": 12},
+        "eeeee": {"skill": 13},
+    }
+    assert max_active == 2
+
+
+async def test__get_skill_levels_batch(mocker: MockerFixture) -> None:
+    redis_cached_batch_patch = mocker.patch("api.services.skills.redis_cached_batch", AsyncMock())
+    user_ids = MagicMock()
+
+    result = await skills.get_skill_levels_batch(user_ids)
+
+    redis_cached_batch_patch.assert_called_once_with(skills.get_skill_levels, skills._fetch_skill_levels, user_ids)
+    assert result == await redis_cached_batch_patch()
@@ -1,12 +1,15 @@
 from typing import Any, Callable
 from unittest.mock import AsyncMock, MagicMock
 
+import pytest
 from _pytest.monkeypatch import MonkeyPatch
 from httpx import AsyncClient
 from pytest_mock import MockerFixture
 
 from ._utils import import_module, mock_asynccontextmanager
 from api import app
+from api.database.database import QueryStats
+from api.settings import settings
 
 
 def get_decorated_function(
@@ -26,27 +29,125 @@ def get_decorated_function(
     return module, functions[0]
 
 
-async def test__db_session(mocker: MockerFixture) -> None:
-    fastapi_patch = mocker.patch("fastapi.FastAPI")
-    expected = MagicMock()
-    request = MagicMock()
+@pytest.mark.parametrize("method,read_only", [("GET", True), ("HEAD", True), ("POST", False), ("PATCH", False)])
+async def test__db_session_middleware(method: str, read_only: bool, mocker: MockerFixture) -> None:
+    mocker.patch("api.app.perf_counter", side_effect=[10, 10.5, 10.75])
+    logger_patch = mocker.patch("api.app.logger")
+    db_patch = mocker.patch("api.app.db")
+    db_patch.stats = QueryStats()
+    db_patch.stats.record("SELECT 1", 0.1)
+    db_patch.stats.record("SELECT 2", 0.2)
+    events: list[Any] = []
+    db_patch.commit = AsyncMock(side_effect=lambda: events.append("commit"))
+    db_context, [func_callback], assert_calls = mock_asynccontextmanager(1, None)
+    db_context_patch = mocker.patch("api.app.db_context", MagicMock(side_effect=lambda **_: db_context()))
+    messages: list[dict[str, Any]] = [
+        {"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/plain")]},
+        {"type": "http.response.body", "body": b"foo"},
+    ]
+
+    async def inner(scope: Any, receive: Any, send: Any) -> None:
+        func_callback()
+        for message in messages:
+            await send(message)
+
+    receive = AsyncMock()
+    send = AsyncMock(side_effect=events.append)
+
+    await app.DBSessionMiddleware(inner)({"type": "http", "method": method, "path": "/jobs"}, receive, send)
+
+    db_context_patch.assert_called_once_with(read_only=read_only)
+    assert_calls()
+    assert events == ["commit", *messages]
+    assert messages[0]["headers"] == [
+        (b"content-type", b"text/plain"),
+        (b"server-timing", b'db;desc="2 statements";dur=300.0, db-slowest;dur=200.0, total;dur=500.0'),
+    ]
+    logger_patch.warning.assert_not_called()
+
+
+@pytest.mark.parametrize("statements", [0, 2])
+async def test__db_session_middleware__slow_request(
+    statements: int, mocker: MockerFixture, monkeypatch: MonkeyPatch
+) -> None:
+    monkeypatch.setattr(settings, "slow_request_threshold", 2)
+    mocker.patch("api.app.perf_counter", side_effect=[10, 11, 12.5])
+    logger_patch = mocker.patch("api.app.logger")
+    db_patch = mocker.patch("api.app.db")
+    db_patch.stats = QueryStats()
+    for i in range(statements):
+        db_patch.stats.record(f"SELECT {i}", 0.25 * (i + 1))
+    db_patch.commit = AsyncMock()
+    mocker.patch("api.app.db_context", MagicMock(side_effect=lambda **_: mock_asynccontextmanager(0, None)[0]()))
+    messages: list[dict[str, Any]] = [
+        {"type": "http.response.start", "status": 404, "headers": []},
+        {"type": "http.response.body"},
+    ]
+
+    async def inner(scope: Any, receive: Any, send: Any) -> None:
+        for message in messages:
+            await send(message)
+
+    await app.DBSessionMiddleware(inner)(
+        {"type": "http", "method": "GET", "path": "/jobs/42"}, AsyncMock(), AsyncMock()
+    )
 
-    module, db_session = get_decorated_function(fastapi_patch, "middleware", "http")
+    if statements:
+        assert messages[0]["headers"] == [
+            (b"server-timing", b'db;desc="2 statements";dur=750.0, db-slowest;dur=500.0, total;dur=1000.0')
+        ]
+        logger_patch.warning.assert_called_once_with(
+            "Slow request: GET /jobs/42 (404) took 2500.0 ms, 2 sql statements took 750.0 ms,"
+            " slowest (500.0 ms): SELECT 1"
+        )
+    else:
+        assert messages[0]["headers"] == [(b"server-timing", b'db;desc="0 statements";dur=0.0, total;dur=1000.0')]
+        logger_patch.warning.assert_called_once_with(
+            "Slow request: GET /jobs/42 (404) took 2500.0 ms, 0 sql statements took 0.0 ms"
+        )
+
+
+async def test__db_session_middleware__streaming(mocker: MockerFixture, monkeypatch: MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "slow_request_threshold", 0)
+    mocker.patch("api.app.perf_counter", side_effect=[10, 10.5, 11])
+    logger_patch = mocker.patch("api.app.logger")
+    db_patch = mocker.patch("api.app.db")
+    db_patch.stats = QueryStats()
+    db_patch.stats.record("SELECT 1", 0.1)
+    db_patch.commit = AsyncMock()
+    mocker.patch("api.app.db_context", MagicMock(side_effect=lambda **_: mock_asynccontextmanager(0, None)[0]()))
+    start: dict[str, Any] = {"type": "http.response.start", "status": 200, "headers": []}
+
+    async def inner(scope: Any, receive: Any, send: Any) -> None:
+        await send(start)
+        db_patch.stats.record("SELECT 2", 0.2)  # e.g. rows fetched while the body is streamed
+        await send({"type": "http.response.body", "body": b"foo"})
+
+    await app.DBSessionMiddleware(inner)({"type": "http", "method": "GET", "path": "/jobs"}, AsyncMock(), AsyncMock())
+
+    assert start["headers"] == [
+        (b"server-timing", b'db;desc="1 statements";dur=100.0, db-slowest;dur=100.0, total;dur=500.0')
+    ]
+    logger_patch.warning.assert_called_once_with(
+        "Slow request: GET /jobs (200) took 1000.0 ms, 2 sql statements took 300.0 ms, slowest (200.0 ms): SELECT 2"
+    )
 
-    module.db_context, [func_callback], assert_calls = mock_asynccontextmanager(1, None)
-    call_next = AsyncMock(side_effect=lambda _: func_callback() or expected)
 
-    result = await db_session(request, call_next)
+async def test__db_session_middleware__no_http(mocker: MockerFixture) -> None:
+    db_context = mocker.patch("api.app.db_context")
+    inner = AsyncMock()
+    scope, receive, send = {"type": "lifespan"}, AsyncMock(), AsyncMock()
 
-    assert_calls()
-    call_next.assert_called_once_with(request)
-    assert result == expected
+    await app.DBSessionMiddleware(inner)(scope, receive, send)
+
+    inner.assert_called_once_with(scope, receive, send)
+    db_context.assert_not_called()
 
 
 async def test__rollback_on_exception(mocker: MockerFixture) -> None:
     fastapi_patch = mocker.patch("fastapi.FastAPI")
     db_patch = mocker.patch("api.database.db")
-    db_patch.session.rollback = AsyncMock()
+    db_patch.rollback = AsyncMock()
     http_exception_patch = mocker.patch("starlette.exceptions.HTTPException")
     http_exception_handler_patch = mocker.patch("fastapi.exception_handlers.http_exception_handler", AsyncMock())
 
@@ -54,14 +155,18 @@ async def test__rollback_on_exception(mocker: MockerFixture) -> None:
 
     result = await rollback_on_exception(request := MagicMock(), exc := MagicMock())
 
-    db_patch.session.rollback.assert_called_once_with()
+    db_patch.rollback.assert_called_once_with()
     http_exception_handler_patch.assert_called_once_with(request, exc)
     assert result == await http_exception_handler_patch()
 
 
-async def test__on_startup(mocker: MockerFixture, monkeypatch: MonkeyPatch) -> None:
+@pytest.mark.parametrize("listener", [False, True])
+async def test__on_startup(listener: bool, mocker: MockerFixture, monkeypatch: MonkeyPatch) -> None:
     fastapi_patch = mocker.patch("fastapi.FastAPI")
     db_patch = mocker.patch("api.database.db")
+    internal_service_patch = mocker.patch("api.services.internal.InternalService")
+    revoked_sessions_patch = mocker.patch("api.revocations.revoked_sessions")
+    monkeypatch.setattr(settings, "revoked_sessions_listener", listener)
 
     module, on_startup = get_decorated_function(fastapi_patch, "on_event", "startup")
     db_patch.create_tables = AsyncMock()
@@ -69,15 +174,24 @@ async def test__on_startup(mocker: MockerFixture, monkeypatch: MonkeyPatch) -> N
     await on_startup()
 
     db_patch.create_tables.assert_not_called()  # use alembic migrations instead
+    internal_service_patch.open_clients.assert_called_once_with()
+    assert revoked_sessions_patch.start.call_count == listener
 
 
 async def test__on_shutdown(mocker: MockerFixture) -> None:
     fastapi_patch = mocker.patch("fastapi.FastAPI")
+    internal_service_patch = mocker.patch("api.services.internal.InternalService")
+    internal_service_patch.close_clients = AsyncMock()
+    revoked_sessions_patch = mocker.patch("api.revocations.revoked_sessions")
+    revoked_sessions_patch.stop = AsyncMock()
 
     _, on_shutdown = get_decorated_function(fastapi_patch, "on_event", "shutdown")
 
     await on_shutdown()
 
+    internal_service_patch.close_clients.assert_called_once_with()
+    revoked_sessions_patch.stop.assert_called_once_with()
+
 
 async def test__status(client: AsyncClient) -> None:
     response = await client.head("/status")
@@ -1,4 +1,6 @@
-from unittest.mock import MagicMock
+from datetime import timedelta
+from typing import Any
+from unittest.mock import AsyncMock, MagicMock
 
 import pytest
 from fastapi.openapi.models import SecuritySchemeType
@@ -7,6 +9,8 @@ from pytest_mock import MockerFixture
 
 from api import auth
 from api.exceptions.auth import InvalidTokenError
+from api.schemas.user import User, UserAccessToken, UserAccessTokenData
+from api.utils.jwt import decode_jwt, encode_jwt
 
 
 @pytest.mark.parametrize("auth_header,token", [("test", "test"), (None, ""), ("Bearer asDF1234", "asDF1234")])
@@ -70,3 +74,56 @@ async def test__jwtauth_call__valid_token(mocker: MockerFixture) -> None:
     assert await auth.JWTAuth.__call__(http_auth, request) == {"foo": "bar"}
 
     get_token.assert_called_once_with(request)
+
+
+def user_token_request(**data: Any) -> MagicMock:
+    token = encode_jwt(
+        {"uid": "user", "rt": "refresh", "data": {"email_verified": True, "admin": False}, **data},
+        timedelta(seconds=60),
+    )
+    return MagicMock(headers={"Authorization": f"Bearer {token}"})
+
+
+async def test__usertokenauth_call(mocker: MockerFixture) -> None:
+    decode_jwt_patch = mocker.patch("api.auth.decode_jwt", wraps=decode_jwt)
+    user_token_auth = auth.UserTokenAuth(16)
+    cache_set = mocker.spy(user_token_auth._cache, "set")
+    request = user_token_request()
+
+    result = await user_token_auth(request)
+
+    assert result == UserAccessToken(
+        uid="user", rt="refresh", data=UserAccessTokenData(email_verified=True, admin=False)
+    )
+    assert await user_token_auth(request) is result
+    decode_jwt_patch.assert_called_once_with(auth.get_token(request))
+    cache_set.assert_called_once()
+    assert 59 < cache_set.call_args[0][2] <= 60
+
+
+@pytest.mark.parametrize(
+    "request_", [MagicMock(headers={"Authorization": "Bearer invalid"}), user_token_request(uid=None)]
+)
+async def test__usertokenauth_call__invalid(request_: MagicMock, mocker: MockerFixture) -> None:
+    decode_jwt_patch = mocker.patch("api.auth.decode_jwt", wraps=decode_jwt)
+    user_token_auth = auth.UserTokenAuth(16)
+
+    assert await user_token_auth(request_) is None
+    assert await user_token_auth(request_) is None
+    assert decode_jwt_patch.call_count == 2
+
+
+async def test__public_auth__no_token() -> None:
+    assert await auth.public_auth.dependency(None) is None
+
+
+@pytest.mark.parametrize("revoked", [False, True])
+async def test__public_auth(revoked: bool, mocker: MockerFixture) -> None:
+    revoked_sessions_patch = mocker.patch("api.schemas.user.revoked_sessions")
+    revoked_sessions_patch.is_revoked = AsyncMock(return_value=revoked)
+    token = UserAccessToken(uid="user", rt="refresh", data=UserAccessTokenData(email_verified=True, admin=False))
+
+    result = await auth.public_auth.dependency(token)
+
+    revoked_sessions_patch.is_revoked.assert_called_once_with("refresh")
+    assert result == (None if revoked else User(id="user", email_verified=True, admin=False))
@@ -1,3 +1,5 @@
+import asyncio
+from asyncio import Event
 from contextvars import ContextVar
 from typing import Any, AsyncIterator
 from unittest.mock import AsyncMock, MagicMock, call
@@ -5,6 +7,8 @@ from unittest.mock import AsyncMock, MagicMock, call
 import pytest
 from _pytest.monkeypatch import MonkeyPatch
 from pytest_mock import MockerFixture
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import DeclarativeMeta, registry
 
 from ._utils import import_module, mock_asynccontextmanager, mock_dict, mock_list
@@ -104,6 +108,7 @@ async def test__base_constructor() -> None:
 
 async def test__constructor(mocker: MockerFixture) -> None:
     create_async_engine_patch = mocker.patch("api.database.database.create_async_engine")
+    instrument_patch = mocker.patch("api.database.database.DB.instrument")
 
     url = MagicMock()
     kwargs = mock_dict(5, string_keys=True)
@@ -112,14 +117,129 @@ async def test__constructor(mocker: MockerFixture) -> None:
 
     create_async_engine_patch.assert_called_once_with(url, **kwargs)
     assert result.engine == create_async_engine_patch()
+    assert result.replica_engines == []
+    instrument_patch.assert_called_once_with(result.engine)
 
-    assert isinstance(result._session, ContextVar)
-    assert result._session.name == "session"
-    assert result._session.get() is None
+    assert isinstance(result._scope, ContextVar)
+    assert result._scope.name == "session_scope"
+    assert result._scope.get() is None
 
-    assert isinstance(result._close_event, ContextVar)
-    assert result._close_event.name == "close_event"
-    assert result._close_event.get() is None
+
+async def test__constructor__replicas(mocker: MockerFixture) -> None:
+    create_async_engine_patch = mocker.patch("api.database.database.create_async_engine")
+    create_async_engine_patch.side_effect = lambda url, **_: f"engine {url}"
+    instrument_patch = mocker.patch("api.database.database.DB.instrument")
+
+    result = database.database.DB("primary", ["replica1", "replica2"], foo="bar")
+
+    assert create_async_engine_patch.call_args_list == [
+        call("primary", foo="bar"),
+        call("replica1", foo="bar"),
+        call("replica2", foo="bar"),
+    ]
+    assert result.engine == "engine primary"
+    assert result.replica_engines == ["engine replica1", "engine replica2"]
+    assert instrument_patch.call_args_list == [call("engine primary"), call("engine replica1"), call("engine replica2")]
+
+
+async def test__instrument(mocker: MockerFixture) -> None:
+    event_patch = mocker.patch("api.database.database.event")
+
+    db = MagicMock()
+    engine = MagicMock()
+
+    database.database.DB.instrument(db, engine)
+
+    assert event_patch.listen.call_args_list == [
+        call(engine.sync_engine, "before_cursor_execute", db._before_cursor_execute),
+        call(engine.sync_engine, "after_cursor_execute", db._after_cursor_execute),
+    ]
+
+
+async def test__cursor_execute_hooks(mocker: MockerFixture) -> None:
+    mocker.patch("api.database.database.perf_counter", side_effect=[10, 10.25])
+
+    db = MagicMock()
+    scope = db._scope.get.return_value = database.database.SessionScope()
+    context = MagicMock()
+
+    database.database.DB._before_cursor_execute(db, MagicMock(), MagicMock(), "SELECT 1", MagicMock(), context, False)
+    database.database.DB._after_cursor_execute(db, MagicMock(), MagicMock(), "SELECT 1", MagicMock(), context, False)
+
+    assert scope.stats.count == 1
+    assert scope.stats.duration == 0.25
+    assert scope.stats.slowest_statement == "SELECT 1"
+
+
+async def test__cursor_execute_hooks__no_scope(mocker: MockerFixture) -> None:
+    mocker.patch("api.database.database.perf_counter", side_effect=[10, 10.25])
+
+    db = MagicMock()
+    db._scope.get.return_value = None
+    context = MagicMock()
+
+    database.database.DB._before_cursor_execute(db, MagicMock(), MagicMock(), "SELECT 1", MagicMock(), context, False)
+    database.database.DB._after_cursor_execute(db, MagicMock(), MagicMock(), "SELECT 1", MagicMock(), context, False)
+
+    db._scope.get.assert_called_once_with()
+
+
+async def test__query_stats() -> None:
+    stats = database.database.QueryStats()
+    assert (stats.count, stats.duration, stats.slowest_duration, stats.slowest_statement) == (0, 0, 0, None)
+
+    stats.record("SELECT 1", 0.25)
+    stats.record("SELECT 2", 0.5)
+    stats.record("SELECT 3", 0.125)
+    stats.record("SELECT 4", 0.5)
+
+    assert stats.count == 4
+    assert stats.duration == 1.375
+    assert stats.slowest_duration == 0.5
+    assert stats.slowest_statement == "SELECT 2"
+
+
+async def test__stats(mocker: MockerFixture) -> None:
+    db = MagicMock()
+    scope = db._scope.get.return_value = database.database.SessionScope()
+
+    assert database.database.DB.stats.fget(db) is scope.stats  # type: ignore
+
+
+async def test__stats__no_scope(mocker: MockerFixture) -> None:
+    db = MagicMock()
+    db._scope.get.return_value = None
+
+    assert database.database.DB.stats.fget(db) is None  # type: ignore
+
+
+async def test__stats__statements() -> None:
+    db = database.database.DB("sqlite+aiosqlite:///:memory:")
+
+    token = db.open_scope()
+    try:
+        await db.exec(text("SELECT 1"))
+        await db.exec(text("SELECT 2"))
+        stats = db.stats
+        await db.close()
+    finally:
+        db.reset_scope(token)
+
+    assert stats
+    assert stats.count == 2
+    assert stats.duration >= stats.slowest_duration > 0
+    assert stats.slowest_statement in ("SELECT 1", "SELECT 2")
+
+
+async def test__session_scope() -> None:
+    scope = database.database.SessionScope()
+
+    assert scope.read_only is False
+    assert scope.session is None
+    assert isinstance(scope.close_event, Event)
+    assert not scope.close_event.is_set()
+    assert isinstance(scope.stats, database.database.QueryStats)
+    assert scope.stats.count == 0
 
 
 async def test__create_tables(mocker: MockerFixture) -> None:
@@ -257,114 +377,284 @@ async def test__get(mocker: MockerFixture) -> None:
     assert result == await db.first()
 
 
+async def test__bulk_delete() -> None:
+    db = MagicMock()
+    db.exec = AsyncMock()
+    statement = MagicMock()
+
+    result = await database.database.DB.bulk_delete(db, statement)
+
+    statement.execution_options.assert_called_once_with(synchronize_session=False)
+    db.exec.assert_called_once_with(statement.execution_options())
+    assert result == db.exec.return_value.rowcount
+
+
+async def test__commit__no_scope() -> None:
+    db = MagicMock()
+    db._scope.get.return_value = None
+
+    await database.database.DB.commit(db)
+
+    db._scope.get.assert_called_once_with()
+
+
 async def test__commit__no_session() -> None:
     db = MagicMock()
-    db._session.get.return_value = None
-    db.session = AsyncMock()
+    db._scope.get.return_value.session = None
 
     await database.database.DB.commit(db)
 
-    db._session.get.assert_called_once_with()
-    db.session.commit.assert_not_called()
+    db._scope.get.assert_called_once_with()
 
 
 async def test__commit__with_session() -> None:
     db = MagicMock()
-    session = db._session.get.return_value = db.session = MagicMock()
+    session = db._scope.get.return_value.session = MagicMock()
     session.commit = AsyncMock()
 
     await database.database.DB.commit(db)
 
-    db._session.get.assert_called_once_with()
+    db._scope.get.assert_called_once_with()
     session.commit.assert_called_once_with()
 
 
-async def test__close__no_session() -> None:
+async def test__rollback__no_scope() -> None:
+    db = MagicMock()
+    db._scope.get.return_value = None
+
+    await database.database.DB.rollback(db)
+
+    db._scope.get.assert_called_once_with()
+
+
+async def test__rollback__no_session() -> None:
+    db = MagicMock()
+    db._scope.get.return_value.session = None
+
+    await database.database.DB.rollback(db)
+
+    db._scope.get.assert_called_once_with()
+
+
+async def test__rollback__with_session() -> None:
     db = MagicMock()
-    db._session.get.return_value = None
-    db.session = AsyncMock()
+    session = db._scope.get.return_value.session = MagicMock()
+    session.rollback = AsyncMock()
+
+    await database.database.DB.rollback(db)
+
+    db._scope.get.assert_called_once_with()
+    session.rollback.assert_called_once_with()
+
+
+async def test__close__no_scope() -> None:
+    db = MagicMock()
+    db._scope.get.return_value = None
 
     await database.database.DB.close(db)
 
-    db._session.get.assert_called_once_with()
-    db.session.close.assert_not_called()
-    db._close_event.get().set.assert_not_called()
+    db._scope.get.assert_called_once_with()
 
 
-async def test__close__with_session_no_close_event() -> None:
+async def test__close__no_session() -> None:
     db = MagicMock()
-    session = db._session.get.return_value = db.session = MagicMock()
-    session.close = AsyncMock()
-    db._close_event.get.return_value = None
+    scope = db._scope.get.return_value = database.database.SessionScope()
 
     await database.database.DB.close(db)
 
-    db._session.get.assert_called_once_with()
-    session.close.assert_called_once_with()
-    db._close_event.get.assert_called_once_with()
+    assert scope.session is None
+    assert scope.close_event.is_set()
 
 
 async def test__close__with_session() -> None:
     db = MagicMock()
-    session = db._session.get.return_value = db.session = MagicMock()
+    scope = db._scope.get.return_value = database.database.SessionScope()
+    session = scope.session = MagicMock()
     session.close = AsyncMock()
 
     await database.database.DB.close(db)
 
-    db._session.get.assert_called_once_with()
     session.close.assert_called_once_with()
-    db._close_event.get.assert_called_once_with()
-    db._close_event.get().set.assert_called_once_with()
+    assert scope.session is None
+    assert scope.close_event.is_set()
+
+
+async def test__open_scope(mocker: MockerFixture) -> None:
+    session_scope_patch = mocker.patch("api.database.database.SessionScope")
+
+    db = MagicMock()
+
+    result = database.database.DB.open_scope(db, read_only := MagicMock())
+
+    session_scope_patch.assert_called_once_with(read_only)
+    db._scope.set.assert_called_once_with(session_scope_patch())
+    assert result == db._scope.set()
+
+
+async def test__reset_scope() -> None:
+    db = MagicMock()
+    token = MagicMock()
+
+    database.database.DB.reset_scope(db, token)
+
+    db._scope.reset.assert_called_once_with(token)
+
+
+async def test__session__no_scope() -> None:
+    db = MagicMock()
+    db._scope.get.return_value = None
 
+    with pytest.raises(RuntimeError):
+        database.database.DB.session.fget(db)  # type: ignore
 
-async def test__create_session(mocker: MockerFixture) -> None:
+
+@pytest.mark.parametrize("read_only", [False, True])
+async def test__session__create(read_only: bool, mocker: MockerFixture) -> None:
     async_session_patch = mocker.patch("api.database.database.AsyncSession")
-    event_patch = mocker.patch("api.database.database.Event")
 
     db = MagicMock()
+    db.get_engines.return_value = ["engine", "fallback1", "fallback2"]
+    scope = db._scope.get.return_value = database.database.SessionScope(read_only)
+
+    result = database.database.DB.session.fget(db)  # type: ignore
+
+    db.get_engines.assert_called_once_with(read_only)
+    async_session_patch.assert_called_once_with("engine")
+    assert result == scope.session == async_session_patch()
+    assert scope.fallback_engines == ["fallback1", "fallback2"]
+
+
+@pytest.mark.parametrize("read_only", [False, True])
+async def test__get_engines__no_replicas(read_only: bool, mocker: MockerFixture) -> None:
+    mocker.patch("api.database.database.create_async_engine", MagicMock)
+    mocker.patch("api.database.database.DB.instrument")
+    db = database.database.DB("primary")
+
+    assert db.get_engines(read_only) == [db.engine]
+
+
+async def test__get_engines__replicas(mocker: MockerFixture) -> None:
+    mocker.patch("api.database.database.create_async_engine", MagicMock)
+    mocker.patch("api.database.database.DB.instrument")
+    db = database.database.DB("primary", ["replica1", "replica2", "replica3"])
+    r1, r2, r3 = db.replica_engines
+
+    assert db.get_engines(False) == [db.engine]
+    assert [db.get_engines(True) for _ in range(4)] == [
+        [r1, r2, r3, db.engine],
+        [r2, r3, r1, db.engine],
+        [r3, r1, r2, db.engine],
+        [r1, r2, r3, db.engine],
+    ]
+    assert db.get_engines(False) == [db.engine]
+
+
+@pytest.mark.parametrize(
+    "read_only,session,expected", [(True, None, False), (True, "session", True), (False, None, False)]
+)
+async def test__use_primary(read_only: bool, session: Any, expected: bool) -> None:
+    db = MagicMock()
+    scope = db._scope.get.return_value = database.database.SessionScope(read_only)
+    scope.session = session
+
+    database.database.DB.use_primary(db)
+
+    assert scope.read_only is expected
+
+
+async def test__use_primary__no_scope() -> None:
+    db = MagicMock()
+    db._scope.get.return_value = None
+
+    database.database.DB.use_primary(db)
+
+
+@pytest.mark.parametrize("failures", [0, 1, 2])
+async def test__connect(failures: int, mocker: MockerFixture) -> None:
+    mocker.patch("api.database.database.create_async_engine", lambda url, **_: MagicMock(url=url))
+    mocker.patch("api.database.database.DB.instrument")
+    logger_patch = mocker.patch("api.database.database.logger")
+    sessions: list[MagicMock] = []
+
+    def create_session(engine: Any) -> MagicMock:
+        session = MagicMock(bind=engine, close=AsyncMock())
+        failed = len(sessions) < failures
+        session.connection = AsyncMock(side_effect=OperationalError("connect", None, OSError()) if failed else None)
+        sessions.append(session)
+        return session
+
+    mocker.patch("api.database.database.AsyncSession", side_effect=create_session)
+    db = database.database.DB("primary", ["replica1", "replica2"])
+    token = db.open_scope(read_only=True)
+
+    await db._connect()
+    await db._connect()
+
+    assert [session.bind for session in sessions] == [*db.replica_engines, db.engine][: failures + 1]
+    assert not db._scope.get().fallback_engines  # type: ignore
+    assert db.session is sessions[-1]
+    for session in sessions[:-1]:
+        session.close.assert_called_once_with()
+    if failures < 2:
+        sessions[-1].connection.assert_called_once_with()
+    else:
+        sessions[-1].connection.assert_not_called()  # the primary is the last resort, its errors are not caught
+    assert logger_patch.warning.call_count == failures
+    db.reset_scope(token)
+
+
+async def test__connect__primary(mocker: MockerFixture) -> None:
+    mocker.patch("api.database.database.create_async_engine", lambda url, **_: MagicMock(url=url))
+    mocker.patch("api.database.database.DB.instrument")
+    async_session_patch = mocker.patch("api.database.database.AsyncSession")
+    db = database.database.DB("primary", ["replica"])
+    token = db.open_scope()
 
-    result = database.database.DB.create_session(db)
+    await db._connect()
 
     async_session_patch.assert_called_once_with(db.engine)
-    db._session.set.assert_called_with(async_session_patch())
-    event_patch.assert_called_once_with()
-    db._close_event.set.assert_called_with(event_patch())
-    assert result == async_session_patch()
+    async_session_patch().connection.assert_not_called()
+    db.reset_scope(token)
 
 
-async def test__session() -> None:
+async def test__session__existing(mocker: MockerFixture) -> None:
+    async_session_patch = mocker.patch("api.database.database.AsyncSession")
+
     db = MagicMock()
+    scope = db._scope.get.return_value = database.database.SessionScope()
+    session = scope.session = MagicMock()
 
     result = database.database.DB.session.fget(db)  # type: ignore
 
-    db._session.get.assert_called_once_with()
-    assert result == db._session.get()
+    async_session_patch.assert_not_called()
+    assert result == session
 
 
-async def test__wait_for_close_event__not_set() -> None:
+async def test__wait_for_close_event__no_scope() -> None:
     db = MagicMock()
-    db._close_event.get.return_value = None
+    db._scope.get.return_value = None
 
     await database.database.DB.wait_for_close_event(db)
 
-    db._close_event.get.assert_called_once_with()
+    db._scope.get.assert_called_once_with()
 
 
 async def test__wait_for_close_event() -> None:
     db = MagicMock()
-    close_event = db._close_event.get.return_value = MagicMock()
-    close_event.wait = AsyncMock()
+    scope = db._scope.get.return_value = MagicMock()
+    scope.close_event.wait = AsyncMock()
 
     await database.database.DB.wait_for_close_event(db)
 
-    db._close_event.get.assert_called_once_with()
-    close_event.wait.assert_called_once_with()
+    db._scope.get.assert_called_once_with()
+    scope.close_event.wait.assert_called_once_with()
 
 
 async def test__get_database(mocker: MockerFixture, monkeypatch: MonkeyPatch) -> None:
     db_patch = mocker.patch("api.database.database.DB")
 
     monkeypatch.setattr(settings, "database_url", url_patch := MagicMock())
+    monkeypatch.setattr(settings, "database_replica_urls", replica_urls_patch := MagicMock())
     monkeypatch.setattr(settings, "pool_recycle", pool_recycle_patch := MagicMock())
     monkeypatch.setattr(settings, "pool_size", pool_size_patch := MagicMock())
     monkeypatch.setattr(settings, "max_overflow", max_overflow_patch := MagicMock())
@@ -374,6 +664,7 @@ async def test__get_database(mocker: MockerFixture, monkeypatch: MonkeyPatch) ->
 
     db_patch.assert_called_once_with(
         url=url_patch,
+        replica_urls=replica_urls_patch,
         pool_pre_ping=True,
         pool_recycle=pool_recycle_patch,
         pool_size=pool_size_patch,
@@ -389,11 +680,29 @@ async def test__db_context(mocker: MockerFixture) -> None:
     db_patch.commit = AsyncMock()
     db_patch.close = AsyncMock()
     db_patch.close.side_effect = lambda: db_patch.commit.assert_called_once_with()
+    db_patch.reset_scope.side_effect = lambda _: db_patch.close.assert_called_once_with()
+
+    async with database.db_context(read_only := MagicMock()):
+        db_patch.open_scope.assert_called_once_with(read_only)
+        db_patch.commit.assert_not_called()
+
+    db_patch.reset_scope.assert_called_once_with(db_patch.open_scope())
 
+
+async def test__db_context__lazy() -> None:
     async with database.db_context():
-        db_patch.create_session.assert_called_once_with()
+        scope = database.db._scope.get()
+        assert scope and scope.session is None
+
+        async def use_session() -> None:
+            assert database.db.session
+
+        await asyncio.create_task(use_session())  # sessions created in child tasks belong to the same context
+        assert scope.session
 
-    db_patch.close.assert_called_once_with()
+    assert scope.session is None
+    assert scope.close_event.is_set()
+    assert database.db._scope.get() is None
 
 
 async def test__db_wrapper(mocker: MockerFixture) -> None:
@@ -0,0 +1,169 @@
+import asyncio
+from typing import Any, AsyncIterator
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from pytest_mock import MockerFixture
+from redis.exceptions import ConnectionError, ResponseError
+
+from api import revocations
+from api.settings import settings
+
+
+async def aiter(*items: Any) -> AsyncIterator[Any]:
+    for item in items:
+        yield item
+
+
+@pytest.fixture
+def redis() -> MagicMock:
+    redis = MagicMock()
+    redis.exists = AsyncMock(return_value=1)
+    redis.config_get = AsyncMock(return_value={"notify-keyspace-events": "KA"})
+    redis.connection_pool.connection_kwargs = {"db": 3}
+    redis.pubsub.return_value.__aenter__.return_value = pubsub = MagicMock()
+    pubsub.psubscribe = AsyncMock()
+    return redis
+
+
+def pmessage(rt: str, event: str) -> dict[str, Any]:
+    return {"type": "pmessage", "channel": f"__keyspace@3__:session_logout:{rt}", "data": event}
+
+
+async def test__is_revoked__not_ready(redis: MagicMock) -> None:
+    revoked = revocations.RevokedSessions(redis)
+
+    assert await revoked.is_revoked("foo") is True
+    redis.exists.assert_called_once_with("session_logout:foo")
+
+    redis.exists.return_value = 0
+    assert await revoked.is_revoked("bar") is False
+
+
+async def test__is_revoked__ready(redis: MagicMock) -> None:
+    revoked = revocations.RevokedSessions(redis)
+    revoked.ready = True
+    revoked._revoked = {"foo"}
+
+    assert await revoked.is_revoked("foo") is True
+    assert await revoked.is_revoked("bar") is False
+    redis.exists.assert_not_called()
+
+
+@pytest.mark.parametrize(
+    "flags,enabled", [("", False), ("KEA", True), ("Kg$x", True), ("Eg$x", False), ("Kg$", False), ("AK", True)]
+)
+async def test__notifications_enabled(flags: str, enabled: bool, redis: MagicMock) -> None:
+    redis.config_get.return_value = {"notify-keyspace-events": flags}
+
+    assert await revocations.RevokedSessions(redis)._notifications_enabled() is enabled
+    redis.config_get.assert_called_once_with("notify-keyspace-events")
+
+
+async def test__handle(redis: MagicMock) -> None:
+    revoked = revocations.RevokedSessions(redis)
+    channel = "__keyspace@3__:"
+
+    revoked._handle({"type": "psubscribe", "channel": "__keyspace@3__:session_logout:*", "data": 1}, channel)
+    revoked._handle(pmessage("foo", "set"), channel)
+    revoked._handle(pmessage("bar", "set"), channel)
+    revoked._handle(pmessage("baz", "set"), channel)
+    revoked._handle(pmessage("foo", "expire"), channel)
+    assert revoked._revoked == {"foo", "bar", "baz"}
+
+    revoked._handle(pmessage("foo", "expired"), channel)
+    revoked._handle(pmessage("bar", "del"), channel)
+    revoked._handle(pmessage("qux", "del"), channel)
+    assert revoked._revoked == {"baz"}
+
+
+async def test__listen(redis: MagicMock) -> None:
+    revoked = revocations.RevokedSessions(redis)
+    redis.scan_iter.return_value = aiter("session_logout:foo", "session_logout:bar")
+    pubsub = redis.pubsub.return_value.__aenter__.return_value
+
+    async def listen() -> AsyncIterator[dict[str, Any]]:
+        assert revoked.ready
+        assert revoked._revoked == {"foo", "bar"}
+        yield pmessage("baz", "set")
+        yield pmessage("foo", "expired")
+
+    pubsub.listen.return_value = listen()
+
+    await revoked._listen()
+
+    pubsub.psubscribe.assert_called_once_with("__keyspace@3__:session_logout:*")
+    redis.scan_iter.assert_called_once_with(match="session_logout:*", count=1000)
+    assert revoked._revoked == {"bar", "baz"}
+
+
+async def test__listen__notifications_disabled(redis: MagicMock) -> None:
+    redis.config_get.return_value = {"notify-keyspace-events": ""}
+    revoked = revocations.RevokedSessions(redis)
+
+    await revoked._listen()
+
+    redis.pubsub.assert_not_called()
+    assert not revoked.ready
+
+
+async def test__run(redis: MagicMock, mocker: MockerFixture) -> None:
+    sleep_patch = mocker.patch("asyncio.sleep", AsyncMock())
+    revoked = revocations.RevokedSessions(redis)
+    revoked.ready = True
+    revoked._revoked = {"foo"}
+    states: list[tuple[bool, set[str]]] = []
+
+    async def listen() -> None:
+        states.append((revoked.ready, set(revoked._revoked)))
+        if len(states) == 1:
+            raise ConnectionError
+        if len(states) == 2:
+            raise ResponseError
+        if len(states) == 3:
+            raise ValueError
+        raise asyncio.CancelledError
+
+    mocker.patch.object(revoked, "_listen", listen)
+
+    with pytest.raises(asyncio.CancelledError):
+        await revoked._run()
+
+    assert states == [(True, {"foo"}), (False, set()), (False, set()), (False, set())]
+    assert sleep_patch.call_count == 3
+    sleep_patch.assert_called_with(settings.revoked_sessions_retry_interval)
+
+
+async def test__start_stop(redis: MagicMock, mocker: MockerFixture) -> None:
+    started = asyncio.Event()
+
+    async def run() -> None:
+        started.set()
+        await asyncio.Event().wait()
+
+    revoked = revocations.RevokedSessions(redis)
+    mocker.patch.object(revoked, "_run", run)
+
+    revoked.start()
+    task = revoked._task
+    revoked.start()
+    assert revoked._task is task
+
+    await started.wait()
+    revoked.ready = True
+    revoked._revoked = {"foo"}
+
+    await revoked.stop()
+
+    assert task and task.cancelled()
+    assert revoked._task is None
+    assert not revoked.ready
+    assert revoked._revoked == set()
+
+
+async def test__stop__not_started(redis: MagicMock) -> None:
+    revoked = revocations.RevokedSessions(redis)
+
+    await revoked.stop()
+
+    assert not revoked.ready
@@ -0,0 +1,395 @@
+import asyncio
+import math
+import pickle
+from importlib.util import find_spec
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from _pytest.monkeypatch import MonkeyPatch
+from pytest_mock import MockerFixture
+
+from api.settings import settings
+from api.utils import cache
+
+
+@pytest.fixture
+def monotonic(mocker: MockerFixture) -> MagicMock:
+    return mocker.patch("api.utils.cache.time.monotonic", return_value=1000)
+
+
+@pytest.fixture
+def redis(monkeypatch: MonkeyPatch) -> AsyncMock:
+    redis = AsyncMock()
+    redis.mget.return_value = [None, None]
+    monkeypatch.setattr(cache, "redis_binary", redis)
+    return redis
+
+
+async def test__local_cache__get_set(monotonic: MagicMock) -> None:
+    local_cache: cache.LocalCache[int] = cache.LocalCache(2)
+
+    assert local_cache.get("foo") is None
+    assert local_cache.get("foo", 42) == 42
+
+    local_cache.set("foo", 1, 10)
+    monotonic.return_value = 1009
+    assert local_cache.get("foo") == 1
+
+    monotonic.return_value = 1010
+    assert local_cache.get("foo") is None
+    assert local_cache._data == {}
+
+
+async def test__local_cache__lru_eviction(monotonic: MagicMock) -> None:
+    local_cache: cache.LocalCache[int] = cache.LocalCache(2)
+
+    local_cache.set("a", 1, 10)
+    local_cache.set("b", 2, 10)
+    assert local_cache.get("a") == 1
+    local_cache.set("c", 3, 10)
+
+    assert local_cache.get("a") == 1
+    assert local_cache.get("b") is None
+    assert local_cache.get("c") == 3
+
+    local_cache.clear()
+    assert local_cache.get("a") is None
+
+
+async def test__redis_cached(redis: AsyncMock) -> None:
+    func = MagicMock(return_value={"foo": "bar"})
+
+    @cache.redis_cached("test_prefix", "x", ttl=42)
+    async def cached(x: int, y: int) -> dict[str, str]:
+        return func(x, y)  # type: ignore
+
+    assert await cached(1, 2) == {"foo": "bar"}
+    func.assert_called_once_with(1, 2)
+    redis.mget.assert_called_once()
+    key, generation_key = redis.mget.call_args[0]
+    assert key.startswith("func_cache:test_prefix:")
+    assert generation_key == "func_cache_gen:test_prefix"
+    redis.setex.assert_called_once()
+    assert redis.setex.call_args[0][:2] == (key, 42)
+
+    redis.mget.return_value = [redis.setex.call_args[0][2], None]
+    assert await cached(1, 3) == {"foo": "bar"}
+    func.assert_called_once()
+    assert redis.mget.call_args[0] == (key, generation_key)
+
+
+async def test__redis_cached__generation(redis: AsyncMock, mocker: MockerFixture) -> None:
+    mocker.patch("api.utils.cache.time.time", return_value=1000)
+    func = MagicMock(return_value=42)
+
+    @cache.redis_cached("test_prefix")
+    async def cached() -> int:
+        return func()  # type: ignore
+
+    redis.mget.return_value = [cache._encode(cache._Entry(1000, "old", 7), cache.PICKLE), b"new"]
+    assert await cached() == 42
+    func.assert_called_once_with()
+    redis.setex.assert_called_once_with(
+        redis.mget.call_args[0][0], settings.cache_ttl, cache._encode(cache._Entry(1000, "new", 42), cache.PICKLE)
+    )
+
+    redis.mget.return_value = [cache._encode(cache._Entry(1000, "new", 7), cache.PICKLE), b"new"]
+    assert await cached() == 7
+    func.assert_called_once()
+
+
+async def test__redis_cached__local(redis: AsyncMock, monkeypatch: MonkeyPatch, monotonic: MagicMock) -> None:
+    monkeypatch.setattr(cache, "_local_caches", {})
+    func = MagicMock(side_effect=lambda x: [x])
+
+    @cache.redis_cached("test_prefix", "x", local_ttl=5)
+    async def cached(x: int) -> list[int]:
+        return func(x)  # type: ignore
+
+    assert await cached(1) == [1]
+    assert await cached(1) == [1]
+    assert await cached(x=2) == [2]
+    assert func.call_count == 2
+    assert redis.mget.call_count == 2
+
+    monotonic.return_value = 1005
+    assert await cached(1) == [1]
+    assert func.call_count == 3
+
+    await cache.clear_cache("test_prefix")
+    assert await cached(1) == [1]
+    assert func.call_count == 4
+
+
+@pytest.fixture
+def redis_store(redis: AsyncMock) -> dict[str, bytes]:
+    store: dict[str, bytes] = {}
+    redis.mget.side_effect = lambda *keys: [store.get(key) for key in keys]
+    redis.setex.side_effect = lambda key, _, value: store.__setitem__(key, value)
+    redis.pipeline = MagicMock()
+    pipe = redis.pipeline.return_value.__aenter__.return_value = MagicMock()
+    pipe.setex.side_effect = lambda key, _, value: store.__setitem__(key, value)
+    pipe.execute = AsyncMock()
+    return store
+
+
+async def test__redis_cached_batch(redis: AsyncMock, redis_store: dict[str, bytes]) -> None:
+    func = MagicMock(side_effect=lambda x: x * 10)
+    load = AsyncMock(side_effect=lambda xs: {x: x * 100 for x in xs})
+
+    @cache.redis_cached("test_prefix", "x", ttl=42)
+    async def cached(x: int) -> int:
+        return func(x)  # type: ignore
+
+    redis_store["func_cache_gen:test_prefix"] = b"gen"
+    assert await cached(2) == 20
+
+    assert await cache.redis_cached_batch(cached, load, [1, 2, 3, 1]) == {1: 100, 2: 20, 3: 300}
+
+    load.assert_called_once_with([1, 3])
+    redis.pipeline.assert_called_once_with(transaction=False)
+    pipe = redis.pipeline.return_value.__aenter__.return_value
+    assert [c.args[1] for c in pipe.setex.call_args_list] == [42, 42]
+    pipe.execute.assert_called_once_with()
+
+    # entries are shared with the decorated function
+    assert await cached(1) == 100
+    assert await cached(3) == 300
+    func.assert_called_once_with(2)
+
+    load.reset_mock()
+    assert await cache.redis_cached_batch(cached, load, [3, 2]) == {3: 300, 2: 20}
+    load.assert_not_called()
+    redis.pipeline.assert_called_once()
+
+
+async def test__redis_cached_batch__generation(redis: AsyncMock, redis_store: dict[str, bytes]) -> None:
+    load = AsyncMock(side_effect=lambda xs: {x: -x for x in xs})
+
+    @cache.redis_cached("test_prefix", "x")
+    async def cached(x: int) -> int:
+        return x
+
+    await cached(1)
+    redis_store["func_cache_gen:test_prefix"] = b"new"
+
+    assert await cache.redis_cached_batch(cached, load, [1]) == {1: -1}
+    assert await cached(1) == -1
+
+
+async def test__redis_cached_batch__empty(redis: AsyncMock) -> None:
+    load = AsyncMock()
+
+    @cache.redis_cached("test_prefix", "x")
+    async def cached(x: int) -> int:
+        return x
+
+    assert await cache.redis_cached_batch(cached, load, []) == {}
+
+    redis.mget.assert_not_called()
+    load.assert_not_called()
+
+
+async def test__redis_cached__cache_config() -> None:
+    @cache.redis_cached("test_prefix", "x", "y", ttl=42, codec=cache.PICKLE)
+    async def cached(x: int, y: int) -> int:
+        return x + y
+
+    assert cached.cache_config == cache.CacheConfig("test_prefix", ("x", "y"), 42, cache.PICKLE)  # type: ignore
+
+
+async def test__redis_cached_batch__codec(redis: AsyncMock, redis_store: dict[str, bytes]) -> None:
+    codec = MagicMock(dumps=MagicMock(side_effect=pickle.dumps), loads=MagicMock(side_effect=pickle.loads))
+
+    @cache.redis_cached("test_prefix", "x", codec=codec)
+    async def cached(x: int) -> int:
+        return x
+
+    assert await cache.redis_cached_batch(cached, AsyncMock(return_value={1: 10}), [1]) == {1: 10}
+    assert await cache.redis_cached_batch(cached, AsyncMock(), [1]) == {1: 10}
+
+    codec.dumps.assert_called_once()
+    codec.loads.assert_called_once()
+
+
+@pytest.mark.parametrize("key", [(), ("x", "y")])
+async def test__redis_cached_batch__invalid(key: tuple[str, ...], redis: AsyncMock) -> None:
+    async def func(x: int, y: int = 0) -> int:
+        return x
+
+    with pytest.raises(ValueError):
+        await cache.redis_cached_batch(func, AsyncMock(), [1])
+    with pytest.raises(ValueError):
+        await cache.redis_cached_batch(cache.redis_cached("test_prefix", *key)(func), AsyncMock(), [1])
+    redis.mget.assert_not_called()
+
+
+async def test__clear_cache(redis: AsyncMock, mocker: MockerFixture, monkeypatch: MonkeyPatch) -> None:
+    uuid4 = mocker.patch("api.utils.cache.uuid4")
+    mocker.patch("api.utils.cache.time.time", return_value=1000.5)
+    local_caches = [MagicMock(), MagicMock()]
+    monkeypatch.setattr(cache, "_local_caches", {"test_prefix": local_caches, "other": [other := MagicMock()]})
+
+    await cache.clear_cache("test_prefix")
+
+    for local_cache in local_caches:
+        local_cache.clear.assert_called_once_with()
+    other.clear.assert_not_called()
+    redis.set.assert_called_once_with("func_cache_gen:test_prefix", f"{uuid4().hex}:1000.5")
+    redis.keys.assert_not_called()
+
+
+async def test__get_generation(redis: AsyncMock) -> None:
+    redis.get.return_value = b"gen"
+
+    assert await cache.get_generation("test_prefix") == "gen"
+    redis.get.assert_called_once_with("func_cache_gen:test_prefix")
+    redis.set.assert_not_called()
+
+
+async def test__get_generation__missing(redis: AsyncMock, mocker: MockerFixture) -> None:
+    uuid4 = mocker.patch("api.utils.cache.uuid4")
+    redis.get.side_effect = [None, b"gen"]
+
+    assert await cache.get_generation("test_prefix") == "gen"
+    redis.set.assert_called_once_with("func_cache_gen:test_prefix", uuid4().hex, nx=True)
+    assert redis.get.call_count == 2
+
+
+@pytest.mark.parametrize(
+    "generation,age", [("abc:990.25", 10.25), ("abc:1000.5", 0), ("abc", math.inf), ("a:b", math.inf)]
+)
+async def test__generation_age(generation: str, age: float, mocker: MockerFixture) -> None:
+    mocker.patch("api.utils.cache.time.time", return_value=1000.5)
+
+    assert cache.generation_age(generation) == age
+
+
+@pytest.mark.parametrize("generation,primary", [("abc:999", True), ("abc:990", False), ("abc", False)])
+async def test__read_generation(
+    generation: str, primary: bool, redis: AsyncMock, mocker: MockerFixture, monkeypatch: MonkeyPatch
+) -> None:
+    monkeypatch.setattr(settings, "database_replica_max_lag", 5)
+    mocker.patch("api.utils.cache.time.time", return_value=1000)
+    use_primary = mocker.patch("api.utils.cache.db.use_primary")
+    redis.get.return_value = generation.encode()
+
+    assert await cache.read_generation("test_prefix") == generation
+    redis.get.assert_called_once_with("func_cache_gen:test_prefix")
+    assert use_primary.call_count == primary
+
+
+async def test__redis_cached__single_flight(redis: AsyncMock) -> None:
+    event = asyncio.Event()
+    calls = []
+
+    @cache.redis_cached("test_prefix", "x")
+    async def cached(x: int) -> int:
+        calls.append(x)
+        await event.wait()
+        return x * 2
+
+    tasks = [asyncio.ensure_future(cached(1)) for _ in range(5)] + [asyncio.ensure_future(cached(2))]
+    await asyncio.sleep(0)
+    event.set()
+
+    assert await asyncio.gather(*tasks) == [2, 2, 2, 2, 2, 4]
+    assert sorted(calls) == [1, 2]
+    assert cache._pending == {}
+
+
+async def test__redis_cached__lock(redis: AsyncMock) -> None:
+    redis.lock = MagicMock()
+    redis_lock = redis.lock.return_value = AsyncMock()
+    redis_lock.acquire.return_value = True
+    func = MagicMock(return_value=42)
+
+    @cache.redis_cached("test_prefix", lock=True)
+    async def cached() -> int:
+        return func()  # type: ignore
+
+    assert await cached() == 42
+
+    key = redis.mget.call_args[0][0]
+    redis.lock.assert_called_once_with(f"func_lock:{key}", timeout=settings.cache_lock_timeout)
+    redis_lock.acquire.assert_called_once_with(blocking=False)
+    func.assert_called_once_with()
+    redis.setex.assert_called_once()
+    redis_lock.release.assert_called_once_with()
+
+
+@pytest.mark.parametrize("ready", [True, False])
+async def test__redis_cached__lock_not_acquired(
+    ready: bool, redis: AsyncMock, mocker: MockerFixture, monkeypatch: MonkeyPatch
+) -> None:
+    redis.lock = MagicMock()
+    redis.lock.return_value.acquire = AsyncMock(return_value=False)
+    redis.mget.side_effect = [
+        [None, b"gen"],
+        [None, b"gen"],
+        [cache._encode(cache._Entry(0, "gen", 7), cache.PICKLE) if ready else None, b"gen"],
+    ] + [[None, b"gen"]] * 100
+    monkeypatch.setattr(settings, "cache_lock_wait", 0.25)
+    mocker.patch("api.utils.cache.asyncio.sleep", AsyncMock())
+    mocker.patch("api.utils.cache.time.monotonic", side_effect=[i / 10 for i in range(100)])
+    func = MagicMock(return_value=42)
+
+    @cache.redis_cached("test_prefix", lock=True)
+    async def cached() -> int:
+        return func()  # type: ignore
+
+    if ready:
+        assert await cached() == 7
+        func.assert_not_called()
+        redis.setex.assert_not_called()
+    else:
+        assert await cached() == 42
+        func.assert_called_once_with()
+        redis.setex.assert_called_once()
+
+
+@pytest.mark.parametrize("age,stale", [(59, False), (60, True)])
+async def test__redis_cached__soft_ttl(age: int, stale: bool, redis: AsyncMock, mocker: MockerFixture) -> None:
+    mocker.patch("api.utils.cache.time.time", return_value=1000 + age)
+    redis.mget.return_value = [cache._encode(cache._Entry(1000, None, 7), cache.PICKLE), None]
+    redis.lock = MagicMock()
+    redis_lock = redis.lock.return_value = AsyncMock()
+    redis_lock.acquire.return_value = True
+    func = MagicMock(return_value=42)
+
+    @cache.redis_cached("test_prefix", ttl=300, soft_ttl=60)
+    async def cached() -> int:
+        return func()  # type: ignore
+
+    assert await cached() == 7
+    key = redis.mget.call_args[0][0]
+    await asyncio.gather(*cache._pending.values())
+
+    if stale:
+        func.assert_called_once_with()
+        redis.setex.assert_called_once_with(key, 300, cache._encode(cache._Entry(1000 + age, None, 42), cache.PICKLE))
+        redis_lock.release.assert_called_once_with()
+    else:
+        func.assert_not_called()
+        redis.setex.assert_not_called()
+        redis.lock.assert_not_called()
+
+
+@pytest.mark.parametrize("codec", [cache.PickleCodec(), *([cache.MsgpackCodec()] if find_spec("msgpack") else [])])
+async def test__codec(codec: cache.Codec) -> None:
+    value = {"foo": [1, 2.5, "bar", None, True], "x": {"y": b"z"}}
+
+    assert codec.loads(codec.dumps(value)) == value
+    assert cache._decode(cache._encode(cache._Entry(1, "gen", value), codec), codec) == cache._Entry(1, "gen", value)
+
+
+@pytest.mark.parametrize("data", [None, b"", b"invalid", pickle.dumps(42)])
+async def test__decode__invalid(data: bytes | None) -> None:
+    assert cache._decode(data, cache.PICKLE) is None
+
+
+async def test__msgpack_codec__not_installed(monkeypatch: MonkeyPatch) -> None:
+    monkeypatch.setattr(cache, "msgpack", None)
+
+    with pytest.raises(RuntimeError):
+        cache.MsgpackCodec()
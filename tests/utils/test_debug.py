@@ -1,12 +1,12 @@
 import json
-from typing import Any, AsyncIterator
+from typing import Any
 from unittest.mock import AsyncMock, MagicMock
 
 import pytest
 from pydantic import create_model
 from pytest_mock import MockerFixture
 
-from api.utils.debug import _check_response_schema, check_responses
+from api.utils.debug import CheckResponsesMiddleware, _check_response_schema
 
 
 @pytest.mark.parametrize(
@@ -52,28 +52,43 @@ async def test___check_response_schema(
 
 
 @pytest.mark.parametrize("json,has_route", [(False, True), (True, False), (True, True)])
-async def test__check_responses(json: bool, has_route: bool, mocker: MockerFixture) -> None:
-    route = MagicMock() if has_route else None
-    request = MagicMock(scope={"route": route})
-    response = MagicMock(headers={"Content-type": "application/json" if json else MagicMock()})
-    call_next = AsyncMock(return_value=response)
+async def test__check_responses_middleware(json: bool, has_route: bool, mocker: MockerFixture) -> None:
+    route = MagicMock()
+    scope = {"type": "http", "method": "GET"}
     check_response_schema = mocker.patch("api.utils.debug._check_response_schema")
+    content_type = b"application/json" if json else b"text/plain"
+    messages = [
+        {"type": "http.response.start", "status": 200, "headers": [(b"content-type", content_type)]},
+        {"type": "http.response.body", "body": b"foo", "more_body": True},
+        {"type": "http.response.body", "body": b"bar", "more_body": True},
+        {"type": "http.response.body", "body": b"12345", "more_body": True},
+        {"type": "http.response.body", "body": b""},
+    ]
 
-    async def body_iterator() -> AsyncIterator[bytes]:
-        yield b"foo"
-        yield b"bar"
-        yield b"12345"
-        yield b""
+    async def inner(_scope: Any, _receive: Any, send: Any) -> None:
+        if has_route:
+            _scope["route"] = route
+        for message in messages:
+            await send(message)
 
-    response.body_iterator = body_iterator()
+    receive = AsyncMock()
+    send = AsyncMock()
 
-    result = await check_responses(request, call_next)
+    await CheckResponsesMiddleware(inner)(scope, receive, send)
 
-    assert result is response
-    assert [chunk async for chunk in result.body_iterator] == [b"foo", b"bar", b"12345", b""]
-
-    call_next.assert_called_once_with(request)
+    assert [c.args[0] for c in send.call_args_list] == messages
     if json and has_route:
-        check_response_schema.assert_called_once_with(request.method, route, response.status_code, b"foobar12345")
+        check_response_schema.assert_called_once_with("GET", route, 200, b"foobar12345")
     else:
         check_response_schema.assert_not_called()
+
+
+async def test__check_responses_middleware__no_http(mocker: MockerFixture) -> None:
+    check_response_schema = mocker.patch("api.utils.debug._check_response_schema")
+    inner = AsyncMock()
+    scope, receive, send = {"type": "lifespan"}, AsyncMock(), AsyncMock()
+
+    await CheckResponsesMiddleware(inner)(scope, receive, send)
+
+    inner.assert_called_once_with(scope, receive, send)
+    check_response_schema.assert_not_called()
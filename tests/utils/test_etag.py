@@ -0,0 +1,34 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from api.utils.etag import etag_matches, make_etag
+
+
+async def test__make_etag() -> None:
+    etag = make_etag("foo", 42, [True, None])
+
+    assert etag.startswith('"') and etag.endswith('"')
+    assert len(etag) == 34
+    assert etag == make_etag("foo", 42, [True, None])
+    assert etag != make_etag("foo", 43, [True, None])
+
+
+@pytest.mark.parametrize(
+    "header,ok",
+    [
+        (None, False),
+        ("", False),
+        ('"abc"', True),
+        ('"xyz"', False),
+        ('W/"abc"', True),
+        ('"xyz", "abc"', True),
+        ('"xyz",W/"abc"', True),
+        ("abc", False),
+        ("*", True),
+    ],
+)
+async def test__etag_matches(header: str | None, ok: bool) -> None:
+    request = MagicMock(headers={"If-None-Match": header} if header is not None else {})
+
+    assert etag_matches(request, '"abc"') is ok
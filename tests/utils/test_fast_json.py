@@ -0,0 +1,76 @@
+import json
+from enum import Enum
+from importlib.util import find_spec
+
+import pytest
+from _pytest.monkeypatch import MonkeyPatch
+from fastapi.encoders import jsonable_encoder
+
+from api.utils import fast_json
+
+
+class Color(Enum):
+    RED = "red"
+
+
+PAYLOAD = {
+    "str": "äöü",
+    "int": 42,
+    "float": 1.5,
+    "none": None,
+    "enum": Color.RED,
+    "list": [1, (2, "x")],
+    "set": {("a", "b", 3)},
+    "nested": {"enum": [Color.RED]},
+}
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+async def test__dumps(use_orjson: bool, monkeypatch: MonkeyPatch) -> None:
+    if not use_orjson:
+        monkeypatch.setattr("api.utils.fast_json.orjson", None)
+    elif not find_spec("orjson"):
+        pytest.skip("orjson is not installed")
+
+    data = fast_json.dumps(PAYLOAD)
+
+    assert isinstance(data, bytes)
+    assert b" " not in data
+    assert json.loads(data) == jsonable_encoder(PAYLOAD)
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+async def test__dumps__unsupported(use_orjson: bool, monkeypatch: MonkeyPatch) -> None:
+    if not use_orjson:
+        monkeypatch.setattr("api.utils.fast_json.orjson", None)
+    elif not find_spec("orjson"):
+        pytest.skip("orjson is not installed")
+
+    with pytest.raises(TypeError):
+        fast_json.dumps({"x": object()})
+
+
+async def test__dumps_stdlib() -> None:
+    assert (
+        fast_json.dumps_stdlib(PAYLOAD)
+        == json.dumps(jsonable_encoder(PAYLOAD), ensure_ascii=False, separators=(",", ":")).encode()
+    )
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+@pytest.mark.parametrize("data", ['["foo", "äöü"]', b'{"x": [1, 1.5, null]}'])
+async def test__loads(use_orjson: bool, data: str | bytes, monkeypatch: MonkeyPatch) -> None:
+    if not use_orjson:
+        monkeypatch.setattr("api.utils.fast_json.orjson", None)
+    elif not find_spec("orjson"):
+        pytest.skip("orjson is not installed")
+
+    assert fast_json.loads(data) == json.loads(data)
+
+
+async def test__fast_json_response() -> None:
+    response = fast_json.FastJSONResponse(PAYLOAD, headers={"ETag": '"abc"'})
+
+    assert response.body == fast_json.dumps(PAYLOAD)
+    assert response.media_type == "application/json"
+    assert response.headers["ETag"] == '"abc"'